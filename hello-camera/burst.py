@@ -0,0 +1,161 @@
+'''Burst capture: grab raw frames first, encode them afterwards.
+
+`capture_sequence` to JPEG files encodes every frame in the capture path,
+so the encoder sets the burst rate. Here the video port fills a
+preallocated ring of raw RGB buffers as fast as the sensor runs, and a
+process pool encodes and saves them once the burst is over.
+
+The ring is a memory-mapped file, so the encoding processes read frames
+straight from it instead of having them pickled across.
+
+Usage:
+    python burst.py [n_pics] [directory]
+    python burst.py --check  # a short burst against fakecamera.py
+'''
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+
+
+def encode_frame(args):
+    '''Encode frame `index` of the ring at `ring_path` and save it to `path`.'''
+    ring_path, shape, index, path, quality = args
+    frames = np.memmap(ring_path, dtype=np.uint8, mode='r', shape=shape)
+    Image.fromarray(np.asarray(frames[index])).save(path, quality=quality)
+    return os.path.getsize(path)
+
+
+class Burst:
+
+    def __init__(self, camera, n_frames, size=None):
+        '''
+        Args:
+            camera (PiCamera): Open camera to capture from.
+            n_frames (int): Frames per burst, the size of the ring.
+            size (tuple): (width, height) to capture at, defaults to the
+                camera's resolution. Raw captures need width a multiple of
+                32 and height of 16.
+        '''
+        width, height = size or camera.resolution
+        if width % 32 or height % 16:
+            raise ValueError('size must be a multiple of 32 x 16, got %r' % ((width, height),))
+        self.camera = camera
+        self.size = (width, height)
+        self.shape = (n_frames, height, width, 3)
+
+        # prefer RAM-backed /dev/shm so the ring never touches the SD card
+        ring_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, self.ring_path = tempfile.mkstemp(suffix='.ring', dir=ring_dir)
+        os.close(fd)
+        self.frames = np.memmap(self.ring_path, dtype=np.uint8, mode='w+', shape=self.shape)
+
+        self.capture_time = None
+        self.encode_time = None
+        self.encoded_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        del self.frames
+        os.remove(self.ring_path)
+
+    def capture(self):
+        '''Fill the ring from the video port.'''
+        resize = self.size if tuple(self.size) != tuple(self.camera.resolution) else None
+        start = time.perf_counter()
+        self.camera.capture_sequence(
+            list(self.frames), format='rgb', use_video_port=True, resize=resize,
+        )
+        self.capture_time = time.perf_counter() - start
+
+    def encode(self, directory='.', name='image%02d.jpg', quality=85, processes=None):
+        '''Encode and save every frame of the last burst in a process pool.
+
+        Returns:
+            list: Paths of the saved images.
+        '''
+        self.frames.flush()
+        paths = [os.path.join(directory, name % i) for i in range(self.shape[0])]
+        jobs = [(self.ring_path, self.shape, i, path, quality) for i, path in enumerate(paths)]
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            self.encoded_bytes = sum(pool.map(encode_frame, jobs))
+        self.encode_time = time.perf_counter() - start
+        return paths
+
+    def stats(self):
+        '''Capture and encode throughput, measured separately.'''
+        n = self.shape[0]
+        return {
+            'frames': n,
+            'capture_fps': n / self.capture_time if self.capture_time else None,
+            'encode_fps': n / self.encode_time if self.encode_time else None,
+            'encode_mb_per_s': self.encoded_bytes / self.encode_time / 1e6 if self.encode_time else None,
+        }
+
+
+def sequence(n_pics=20, directory='.', size=None, camera=None):
+    '''Take a burst of pictures, like hello.sequence but encoded after capture.'''
+    opened = camera is None
+    if opened:
+        from picamera import PiCamera
+        camera = PiCamera()
+    try:
+        camera.start_preview()
+        time.sleep(2)
+        with Burst(camera, n_pics, size=size) as burst:
+            burst.capture()
+            camera.stop_preview()
+            burst.encode(directory)
+            return burst.stats()
+    finally:
+        # the camera stays busy for every later PiCamera() until closed
+        if opened:
+            camera.close()
+
+
+def check(n_frames=8):
+    '''A burst from the fake camera fills the ring and measures both rates.'''
+    from fakecamera import PiCamera
+
+    with tempfile.TemporaryDirectory() as directory, PiCamera(resolution=(64, 48), realtime=False) as camera:
+        with Burst(camera, n_frames) as burst:
+            burst.capture()
+            filled = burst.frames.reshape(n_frames, -1).any(axis=1)
+            assert filled.all(), 'frames %s of the ring are empty' % np.flatnonzero(~filled).tolist()
+            paths = burst.encode(directory)
+            assert all(os.path.getsize(path) for path in paths), 'empty image files'
+            stats = burst.stats()
+    assert stats['capture_fps'] and stats['encode_fps'], 'missing rates in %r' % stats
+    return stats
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    if sys.argv[1:] == ['--check']:
+        print('ok', check())
+        sys.exit()
+
+    try:
+        from picamera import PiCamera
+    except ImportError:
+        from fakecamera import PiCamera
+
+    n_pics = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    directory = sys.argv[2] if len(sys.argv) > 2 else '.'
+
+    with PiCamera() as camera:
+        with Burst(camera, n_pics) as burst:
+            burst.capture()
+            burst.encode(directory)
+            print(burst.stats())
@@ -0,0 +1,87 @@
+'''Stand-in for picamera.PiCamera that produces synthetic frames.
+
+Frames are a color gradient with a square that moves one step per frame,
+plus optional sensor noise, so capture code can be run and timed off the Pi.
+'''
+import io
+import time
+import numpy as np
+from PIL import Image
+
+
+class PiCamera:
+
+    def __init__(self, resolution=(640, 480), framerate=30, realtime=True, noise=0):
+        '''
+        Args:
+            resolution (tuple): (width, height) of full frames.
+            framerate (float): Video port frame rate.
+            realtime (bool): Sleep one frame period per video port frame,
+                like the real sensor.
+            noise (int): Amplitude of random noise added to each frame.
+        '''
+        self.resolution = resolution
+        self.framerate = framerate
+        self.realtime = realtime
+        self.noise = noise
+        self.moving = True
+        self.frame_count = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def start_preview(self):
+        pass
+
+    def stop_preview(self):
+        pass
+
+    def frame(self, size):
+        '''The next synthetic (height, width, 3) uint8 frame.'''
+        width, height = size
+        y, x = np.mgrid[0:height, 0:width]
+        frame = np.stack([
+            255 * x // max(width - 1, 1),
+            255 * y // max(height - 1, 1),
+            np.full_like(x, 128),
+        ], axis=-1)
+
+        # a square a quarter of the frame wide, moving right
+        side = max(width // 4, 1)
+        left = (self.frame_count * max(width // 32, 1)) % width if self.moving else 0
+        top = height // 2 - side // 2
+        frame[max(top, 0):top + side, left:left + side] = 255
+
+        if self.noise:
+            frame = frame + np.random.randint(-self.noise, self.noise + 1, size=frame.shape)
+        self.frame_count += 1
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+    def capture(self, output, format=None, use_video_port=False, resize=None, **options):
+        if self.realtime and use_video_port:
+            time.sleep(1 / self.framerate)
+        frame = self.frame(resize or self.resolution)
+
+        if isinstance(output, str):
+            Image.fromarray(frame).save(output)
+        elif hasattr(output, 'write'):
+            if format in ('rgb', 'yuv', None):
+                output.write(frame.tobytes())
+            else:
+                buf = io.BytesIO()
+                Image.fromarray(frame).save(buf, format=format)
+                output.write(buf.getvalue())
+        else:
+            # raw capture into a writeable buffer, e.g. a NumPy array
+            np.frombuffer(output, dtype=np.uint8)[:frame.size] = frame.ravel()
+
+    def capture_sequence(self, outputs, format='jpeg', use_video_port=False, resize=None, **options):
+        for output in outputs:
+            self.capture(output, format=format, use_video_port=use_video_port, resize=resize)
@@ -1,6 +1,5 @@
 import time
 from picamera import PiCamera
-from PIL import Image
 try:
     from sense_hat import SenseHat
 except ImportError:
@@ -20,24 +19,26 @@ def sequence(n_pics=20):
 
 if __name__ == '__main__':
 
+    import sys
+    from stream import Stream
+    from motion import MotionStream
+
     camera = PiCamera()
     hat = SenseHat()
 
-    while True:
-
-        # take picture
-        camera.capture('snap.jpg')
-
-        # convert to 8x8 pixels
-        img = Image.open('snap.jpg').resize((8, 8))
-
-        # display on sense hat
-        hat.set_pixels(img.getdata())
-
-        # save small image
-        img.save('snap-small.jpg')
-
-        # wait
-        time.sleep(3)
+    args = sys.argv[1:]
+    motion = '--motion' in args
+    if motion:
+        args.remove('--motion')
+
+    # pass a folder to also save captures there, one every 3 s
+    save_dir = args[0] if args else None
+    if motion:
+        # only capture, show and save when the scene changes
+        stream = MotionStream(camera, hat, save_dir=save_dir)
+    else:
+        stream = Stream(camera, hat, save_dir=save_dir, save_every=3)
+    stream.run()
+    print(stream.stats())
 
     camera.close()
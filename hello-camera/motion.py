@@ -0,0 +1,146 @@
+'''Camera preview that only wakes up when the scene changes.
+
+Stream captures, shows and saves every frame. MotionStream instead takes a
+tiny probe frame from the video port, turns it to grayscale and compares it
+with the previous probe. Only when enough of the probe has changed does it
+take a full size capture, update the hat and save.
+
+Usage:
+    python motion.py [seconds]
+'''
+import time
+import numpy as np
+from stream import Stream
+
+# ITU-R 601 luma weights
+GRAY = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def grayscale(frame):
+    '''(h, w, 3) uint8 to (h, w) float32 luma.'''
+    return np.dot(frame, GRAY)
+
+
+def change_score(previous, current, noise=12):
+    '''Fraction of pixels whose gray level moved by more than `noise`.'''
+    return np.count_nonzero(np.abs(current - previous) > noise) / current.size
+
+
+class MotionStream(Stream):
+
+    def __init__(self, camera, hat, size=(640, 480), probe_size=(32, 16), noise=12,
+                 threshold=0.05, probe_every=0.1, **kwargs):
+        '''
+        Args:
+            camera (PiCamera): Open camera to capture from.
+            hat (SenseHat): Hat to show the preview on.
+            size (tuple): (width, height) of captures taken on motion.
+            probe_size (tuple): (width, height) of the frames compared for
+                motion, a multiple of 32 x 16.
+            noise (float): Gray level change ignored as sensor noise.
+            threshold (float): Fraction of probe pixels that must change to
+                count as motion.
+            probe_every (float): Seconds between probes.
+            **kwargs: Passed on to Stream.
+        '''
+        super().__init__(camera, hat, size=size, **kwargs)
+        width, height = probe_size
+        if width % 32 or height % 16:
+            raise ValueError('probe_size must be a multiple of 32 x 16')
+        self.probe_size = probe_size
+        self.probe = np.empty((height, width, 3), dtype=np.uint8)
+        self.reference = None
+        self.noise = noise
+        self.threshold = threshold
+        self.probe_every = probe_every
+
+        self.score = 0.0
+        self.probes = 0
+        self.triggered = 0
+        self.probe_time = 0.0
+        self.capture_time = 0.0
+
+    def check(self):
+        '''Take a probe and score it against the last one.
+
+        Returns:
+            bool: Whether the scene changed.
+        '''
+        start = time.thread_time()
+        self.camera.capture(self.probe, 'rgb', use_video_port=True, resize=self.probe_size)
+        gray = grayscale(self.probe)
+        previous, self.reference = self.reference, gray
+        # the first probe has nothing to compare with, so it always shows
+        self.score = 1.0 if previous is None else float(change_score(previous, gray, self.noise))
+        self.probes += 1
+        self.probe_time += time.thread_time() - start
+        return self.score > self.threshold
+
+    def capture_loop(self):
+        while not self.stopped.is_set():
+            deadline = time.monotonic() + self.probe_every
+            if self.check():
+                buf = self.next_buffer()
+                if buf is not None:
+                    start = time.thread_time()
+                    self.capture(buf)
+                    self.capture_time += time.thread_time() - start
+                    self.captured += 1
+                    self.triggered += 1
+                    self.full.put(buf)
+            self.stopped.wait(max(deadline - time.monotonic(), 0))
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            'probes': self.probes,
+            'triggered': self.triggered,
+            'score': self.score,
+            # CPU time of the capture thread, not time spent waiting for frames
+            'probe_ms': 1000 * self.probe_time / self.probes if self.probes else None,
+            'capture_ms': 1000 * self.capture_time / self.triggered if self.triggered else None,
+        })
+        return stats
+
+
+if __name__ == '__main__':
+
+    import sys
+    import tempfile
+    import threading
+    from PIL import Image
+
+    try:
+        from picamera import PiCamera
+    except ImportError:
+        from fakecamera import PiCamera
+    try:
+        from sense_hat import SenseHat
+    except ImportError:
+        try:
+            from sense_emu import SenseHat
+        except ImportError:
+            sys.path.append('../sense-hat')
+            from headless import SenseHat
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    with PiCamera() as camera, tempfile.TemporaryDirectory() as save_dir:
+        stream = MotionStream(camera, SenseHat(), save_dir=save_dir)
+
+        # off the Pi, hold the fake scene still for the first half, then move it
+        if hasattr(camera, 'moving'):
+            camera.noise = 3
+            camera.moving = False
+            threading.Timer(seconds / 2, setattr, (camera, 'moving', True)).start()
+
+        stream.run(seconds)
+        stats = stream.stats()
+        print(stats)
+
+        # what every probe would cost without the trigger: full capture plus JPEG
+        start = time.thread_time()
+        Image.fromarray(stream.free.get()).save(save_dir + '/cost.jpg')
+        full_ms = stats['capture_ms'] + 1000 * (time.thread_time() - start)
+        print('CPU per idle probe %.2f ms vs full capture-and-encode %.2f ms (%.1f%%)' % (
+            stats['probe_ms'], full_ms, 100 * stats['probe_ms'] / full_ms))
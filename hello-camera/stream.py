@@ -0,0 +1,165 @@
+'''Live camera preview on the sense hat without going through the SD card.
+
+A camera thread captures small raw RGB frames from the video port into a
+ring of reusable NumPy buffers. A display thread shrinks each one to 8x8
+and pushes it to the hat. Saving is optional and happens on a third thread,
+so a slow card never holds up the preview.
+'''
+import os
+import queue
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+
+def downsample(frame, dim=8):
+    '''Average (h, w, 3) down to (dim, dim, 3), h and w multiples of dim.'''
+    h, w, _ = frame.shape
+    return frame.reshape(dim, h // dim, dim, w // dim, 3).mean(axis=(1, 3)).astype(np.uint8)
+
+
+class Stream:
+
+    def __init__(self, camera, hat, size=(32, 32), buffers=4, save_dir=None, save_every=None, dim=8):
+        '''
+        Args:
+            camera (PiCamera): Open camera to capture from.
+            hat (SenseHat): Hat to show the preview on.
+            size (tuple): (width, height) the GPU resizes captures to. Raw
+                captures need width a multiple of 32 and height of 16.
+            buffers (int): Number of reusable capture buffers, at least 2.
+            save_dir (str): Folder to save captures in, or None to never
+                touch the disk.
+            save_every (float): Seconds between saved captures.
+            dim (int): Side length of the hat.
+        '''
+        width, height = size
+        if width % 32 or height % 16 or width % dim or height % dim:
+            raise ValueError('size must be a multiple of 32 x 16 and of %d' % dim)
+        if buffers < 2:
+            raise ValueError('need at least 2 buffers')
+        self.camera = camera
+        self.hat = hat
+        self.size = size
+        self.dim = dim
+        self.save_dir = save_dir
+        self.save_every = save_every
+
+        # buffers cycle free -> captured -> shown -> free, never reallocated
+        self.free = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(np.empty((height, width, 3), dtype=np.uint8))
+        self.full = queue.Queue()
+
+        # copies waiting to be saved, dropped when the card falls behind
+        self.saves = queue.Queue(maxsize=buffers)
+
+        self.stopped = threading.Event()
+        self.threads = []
+        self.captured = 0
+        self.shown = 0
+        self.dropped = 0
+        self.saved = 0
+        self.last_save = None
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        targets = [self.capture_loop, self.display_loop]
+        if self.save_dir is not None:
+            targets.append(self.save_loop)
+        self.threads = [threading.Thread(target=target, daemon=True) for target in targets]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.saves.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def run(self, seconds=None):
+        '''Stream until `seconds` have passed, or until interrupted.'''
+        self.start()
+        try:
+            if seconds is None:
+                while True:
+                    time.sleep(1)
+            else:
+                time.sleep(seconds)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def next_buffer(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+        # the display is behind, so overwrite the oldest frame waiting for it
+        try:
+            buf = self.full.get(timeout=0.5)
+        except queue.Empty:
+            return None
+        self.dropped += 1
+        return buf
+
+    def capture_loop(self):
+        while not self.stopped.is_set():
+            buf = self.next_buffer()
+            if buf is None:
+                continue
+            self.capture(buf)
+            self.captured += 1
+            self.full.put(buf)
+
+    def capture(self, buf):
+        self.camera.capture(buf, 'rgb', use_video_port=True, resize=self.size)
+
+    def display_loop(self):
+        while not self.stopped.is_set():
+            try:
+                buf = self.full.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.show(buf)
+            self.free.put(buf)
+
+    def show(self, buf):
+        frame = downsample(buf, self.dim)
+        self.hat.set_pixels(frame.reshape(-1, 3).tolist())
+        self.shown += 1
+        self.maybe_save(buf)
+
+    def maybe_save(self, buf):
+        if self.save_dir is None:
+            return
+        now = time.monotonic()
+        if self.last_save is not None and now - self.last_save < (self.save_every or 0):
+            return
+        try:
+            self.saves.put_nowait(buf.copy())
+            self.last_save = now
+        except queue.Full:
+            pass
+
+    def save_loop(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+        while True:
+            frame = self.saves.get()
+            if frame is None:
+                return
+            Image.fromarray(frame).save(os.path.join(self.save_dir, 'snap-%06d.jpg' % self.saved))
+            self.saved += 1
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return {
+            'captured': self.captured,
+            'shown': self.shown,
+            'dropped': self.dropped,
+            'saved': self.saved,
+            'fps': self.shown / elapsed if elapsed else 0.0,
+        }
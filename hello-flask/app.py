@@ -1,13 +1,22 @@
-from flask import Flask, render_template
+from flask import Flask, Response, abort, jsonify, request
 from ledcontroller import LEDController
+from pagecache import PageCache
+from payload import Payload
+from sensors import SensorHub
 import datetime
+import os
 
 
 app = Flask(__name__)
 
+# polled by dashboards, so kept in memory and answered with 304s when unchanged
+DATA = Payload(os.path.join(app.static_folder, 'data.json'))
 
-@app.route('/')
-def hello():
+# the index pages only change once a minute
+PAGES = PageCache()
+
+
+def index_data():
     now = datetime.datetime.now()
     timeString = now.strftime("%Y-%m-%d %H:%M")
     templateData = {
@@ -16,27 +25,87 @@ def hello():
         'message': 'this is a message',
         'content': 'this is some content',
     }
-    return render_template('index.html', **templateData)
+    return templateData
+
+
+@app.route('/')
+def hello():
+    return PAGES.render('index.html', **index_data())
+
+
+def led_params(args):
+    '''Command parameters from the query string.
+
+    `count` is an int, `on` and `off` are seconds and `steps` is a pattern
+    written as state:seconds pairs, e.g. steps=1:0.2,0:0.1,1:0.6. Values
+    out of range are rejected by LEDController.submit, also with a 400.
+    '''
+    params = {}
+    try:
+        if 'count' in args:
+            params['count'] = int(args['count'])
+        for name in ('on', 'off'):
+            if name in args:
+                params[name] = float(args[name])
+        if 'steps' in args:
+            params['steps'] = [
+                (int(state), float(seconds))
+                for state, seconds in (step.split(':') for step in args['steps'].split(','))
+            ]
+    except ValueError:
+        abort(400, 'bad led parameters')
+    return params
+
+
+def queue_led(args):
+    '''Queue the command in `args` for the pin's worker without waiting for it.
+
+    Returns:
+        tuple: (job id, queue depth)
+    '''
+    controller = LEDController.get()
+    command = args.get('command', 'blink')
+    try:
+        job_id = controller.submit(command, **led_params(args))
+    except (ValueError, TypeError) as exc:
+        abort(400, str(exc))
+    return job_id, controller.depth()
+
 
 @app.route('/led')
 def led():
-    now = datetime.datetime.now()
-    timeString = now.strftime("%Y-%m-%d %H:%M")
-    templateData = {
-        'title': 'HELLO!',
-        'time': timeString,
-        'message': 'this is a message',
-        'content': 'this is some content',
-    }
+    job_id, depth = queue_led(request.args)
 
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        response = jsonify(job=job_id, queued=depth)
+    else:
+        response = app.make_response(PAGES.render('index.html', **index_data()))
+    response.headers['X-Job-Id'] = str(job_id)
+    response.headers['X-Queue-Depth'] = str(depth)
+    return response
 
-    led_controller = LEDController()
-    return render_template('index.html', **templateData)
+
+@app.route('/led/<int:job_id>')
+def led_job(job_id):
+    controller = LEDController.get()
+    return jsonify(job=job_id, status=controller.status(job_id), queued=controller.depth())
 
 
 @app.route('/api/data')
 def get_data():
-    return app.send_static_file('data.json')
+    return DATA.response(request)
+
+
+@app.route('/api/stream')
+def sensor_stream():
+    '''Sensor state changes as server-sent events, from the shared sampler.'''
+    hub = SensorHub.get()
+    last_seq = request.headers.get('Last-Event-ID', type=int)
+    return Response(hub.sse(last_seq), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # ask proxies not to hold events back
+        'X-Accel-Buffering': 'no',
+    })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=4000)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=4000)
@@ -0,0 +1,101 @@
+'''The hello-flask routes as a plain ASGI app, for an async server.
+
+Pages come from the minute cache and /api/data is a header comparison or
+an in-memory body, so those answer on the event loop without blocking.
+With several workers the /led routes call the GPIO owner process, see
+owner.py, and run on a thread so the round trip doesn't hold up the loop.
+So one event loop per worker can keep many connections open at once where
+the WSGI server needs a thread each. The SSE stream stays on the WSGI app.
+
+Run with several workers through serve.py:
+
+    python serve.py --asgi --workers 4
+'''
+import asyncio
+import json
+import re
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import Headers, MIMEAccept, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+from ledcontroller import LEDController
+import owner
+from app import DATA, PAGES, app as flask_app, index_data, queue_led
+
+LED_JOB = re.compile(r'^/led/(\d+)$')
+
+
+def page():
+    # only a cache miss renders, and rendering needs the Flask app context
+    with flask_app.app_context():
+        html = PAGES.render('index.html', **index_data())
+    return 200, html.encode(), [('Content-Type', 'text/html; charset=utf-8')]
+
+
+def as_json(**values):
+    return 200, json.dumps(values).encode(), [('Content-Type', 'application/json')]
+
+
+def route(path, args, headers):
+    '''(status, body, headers) for a GET of `path`.'''
+    if path == '/':
+        return page()
+
+    if path == '/led':
+        job_id, depth = queue_led(args)
+        accept = parse_accept_header(headers.get('Accept'), MIMEAccept)
+        if accept.best_match(['text/html', 'application/json']) == 'application/json':
+            status, body, response_headers = as_json(job=job_id, queued=depth)
+        else:
+            status, body, response_headers = page()
+        response_headers += [('X-Job-Id', str(job_id)), ('X-Queue-Depth', str(depth))]
+        return status, body, response_headers
+
+    match = LED_JOB.match(path)
+    if match:
+        controller = LEDController.get()
+        job_id = int(match.group(1))
+        return as_json(job=job_id, status=controller.status(job_id), queued=controller.depth())
+
+    if path == '/api/data':
+        return DATA.conditional(headers)
+
+    return 404, b'Not Found', [('Content-Type', 'text/plain')]
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] not in ('GET', 'HEAD'):
+        status, body, headers = 405, b'Method Not Allowed', [('Content-Type', 'text/plain'), ('Allow', 'GET, HEAD')]
+    else:
+        headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1')))
+        try:
+            if owner.address() and scope['path'].startswith('/led'):
+                # a blocking call to the owner process
+                status, body, headers = await asyncio.to_thread(route, scope['path'], args, headers)
+            else:
+                status, body, headers = route(scope['path'], args, headers)
+        except HTTPException as exc:
+            status, body, headers = exc.code, exc.description.encode(), [('Content-Type', 'text/plain')]
+
+    if status != 304:
+        headers = headers + [('Content-Length', str(len(body)))]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
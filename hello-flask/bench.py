@@ -0,0 +1,131 @@
+'''Requests per second and latency of hello-flask under concurrent clients.
+
+Starts serve.py against the fake GPIO in each serving mode, then drives
+`/`, `/led` and `/api/data` in turn with keep-alive clients spread over a
+few client processes, and prints requests per second with p50 and p99
+latency. The clients share the machine with the server, so compare modes
+with each other rather than with numbers from another box.
+
+Usage:
+    python bench.py [--clients 32] [--seconds 5] [--modes wsgi:1 wsgi:4 asgi:1 asgi:4]
+'''
+from concurrent.futures import ProcessPoolExecutor
+import http.client
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+# /led turns the LED on rather than queueing a 2.5 s blink per request
+ROUTES = ('/', '/led?command=on', '/api/data')
+MODES = ('wsgi:1', 'wsgi:4', 'asgi:1', 'asgi:4')
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def drive(args):
+    '''Run `threads` keep-alive clients for `seconds` on one route.
+
+    Returns:
+        tuple: (latencies in seconds, errors)
+    '''
+    port, path, threads, seconds = args
+    deadline = time.monotonic() + seconds
+    latencies = []
+    errors = [0]
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            # list.append is atomic, so the threads can share the list
+            latencies.append(time.perf_counter() - start)
+        conn.close()
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors[0]
+
+
+def bench(port, path, clients=32, seconds=5.0, processes=None):
+    processes = min(processes or os.cpu_count(), clients)
+    jobs = [(port, path, clients // processes + (i < clients % processes), seconds) for i in range(processes)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(drive, jobs))
+
+    latencies = np.concatenate([np.asarray(latency) for latency, _ in results])
+    return {
+        'requests': latencies.size,
+        'errors': sum(errors for _, errors in results),
+        'rps': latencies.size / seconds,
+        'p50_ms': 1000 * np.percentile(latencies, 50) if latencies.size else None,
+        'p99_ms': 1000 * np.percentile(latencies, 99) if latencies.size else None,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, workers, port, timeout=10):
+    command = [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--fake-gpio']
+    if mode == 'asgi':
+        command.append('--asgi')
+    server = subprocess.Popen(command, cwd=HERE)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('server for %s:%d did not come up' % (mode, workers))
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--modes', nargs='+', default=MODES, help='mode:workers, mode is wsgi or asgi')
+    args = parser.parse_args()
+
+    print('%-8s %-18s %10s %8s %8s %8s' % ('mode', 'route', 'rps', 'p50 ms', 'p99 ms', 'errors'))
+    for spec in args.modes:
+        mode, workers = spec.split(':')
+        if mode == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+            print('%-8s skipped, uvicorn is not installed' % spec)
+            continue
+
+        port = free_port()
+        server = start_server(mode, int(workers), port)
+        try:
+            for path in ROUTES:
+                row = bench(port, path, args.clients, args.seconds)
+                print('%-8s %-18s %10.0f %8.2f %8.2f %8d' % (
+                    spec, path, row['rps'], row['p50_ms'], row['p99_ms'], row['errors']))
+        finally:
+            server.terminate()
+            server.wait()
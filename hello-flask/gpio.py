@@ -0,0 +1,24 @@
+'''RPi.GPIO for the app, or the simulator in hello-gpio when asked for.
+
+Set FAKE_GPIO=1, or run serve.py --fake-gpio, to serve off the Pi. Without
+it a missing RPi.GPIO stays an ImportError, rather than an app that
+answers /led with a 200 and drives nothing.
+'''
+import os
+import sys
+
+HELLO_GPIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hello-gpio')
+
+
+def install_fake_gpio():
+    '''Back RPi.GPIO with hello-gpio/fakegpio.py.'''
+    if HELLO_GPIO not in sys.path:
+        sys.path.append(HELLO_GPIO)
+    import fakegpio
+    fakegpio.install()
+
+
+if os.environ.get('FAKE_GPIO'):
+    install_fake_gpio()
+
+import RPi.GPIO as GPIO
@@ -1,23 +1,178 @@
-import RPi.GPIO as GPIO
-import time
+'''One long-lived worker that owns the LED pin.
 
-class LEDController:
+Commands are queued and played in order on the worker thread, so a request
+that asks for a blink returns at once instead of sleeping through it, and
+concurrent requests never race on the pin. With several server processes
+the worker lives in the owner process, see owner.py.
+'''
+import atexit
+import inspect
+import logging
+import math
+import queue
+import threading
+import owner
+from gpio import GPIO
 
-    def __init__(self):
+LED = 18
+COMMANDS = ('blink', 'on', 'off', 'pattern')
+
+# one job must not hold the queue for long, the worker plays them in order
+MAX_COUNT = 100
+MAX_SECONDS = 60.0
+MAX_STEPS = 100
+
+log = logging.getLogger(__name__)
+
+
+def check_seconds(name, seconds):
+    if not 0 <= seconds <= MAX_SECONDS:
+        # also false for nan
+        raise ValueError('%s must be between 0 and %g seconds' % (name, MAX_SECONDS))
+
+
+def check_params(command, params):
+    '''Raise ValueError if `params` are out of range for `command`.'''
+    if command == 'blink':
+        count = params.get('count', 1)
+        if not 0 <= count <= MAX_COUNT:
+            raise ValueError('count must be between 0 and %d' % MAX_COUNT)
+        for name in ('on', 'off'):
+            if name in params:
+                check_seconds(name, params[name])
+    elif command == 'pattern':
+        steps = params['steps']
+        if len(steps) > MAX_STEPS:
+            raise ValueError('at most %d steps' % MAX_STEPS)
+        for state, seconds in steps:
+            check_seconds('step', seconds)
+        if math.fsum(seconds for state, seconds in steps) > MAX_SECONDS:
+            raise ValueError('pattern must last at most %g seconds' % MAX_SECONDS)
+
+
+class LEDController(threading.Thread):
+
+    controllers = {}
+    controllers_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, pin=LED):
+        '''The controller for `pin`, set up and started on first use in this process.'''
+        if owner.address():
+            # another process owns the pins, see owner.py
+            return owner.proxy('led')
+        with cls.controllers_lock:
+            controller = cls.controllers.get(pin)
+            if controller is None or not controller.is_alive():
+                controller = cls.controllers[pin] = cls(pin)
+                controller.start()
+                atexit.register(controller.stop)
+        return controller
+
+    def __init__(self, pin=LED):
+        super().__init__(daemon=True)
+        self.pin = pin
+        self.commands = queue.Queue()
+        self.stopped = threading.Event()
+
+        # jobs are numbered in queue order, so their status follows from
+        # the job playing now and the last one finished
+        self.submit_lock = threading.Lock()
+        self.issued = 0
+        self.current = 0
+        self.done = 0
 
         # use broadcomm GPIO naming schema
         GPIO.setmode(GPIO.BCM)
 
-        # setup GPIO pin 18 as an output
-        GPIO.setup(18, GPIO.OUT)
+        # setup GPIO pin as an output, start with LED off
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, GPIO.LOW)
+
+    def submit(self, command, **params):
+        '''Queue a command for the worker.
+
+        Returns:
+            int: Job id, for `status`.
+
+        Raises:
+            ValueError: If the command is unknown or a parameter out of range.
+            TypeError: If the parameters don't fit the command.
+        '''
+        if command not in COMMANDS:
+            raise ValueError('unknown command %r, expected one of %s' % (command, ', '.join(COMMANDS)))
+        # fail here, in the caller, rather than on the worker
+        inspect.signature(getattr(self, command)).bind(**params)
+        check_params(command, params)
+        with self.submit_lock:
+            self.issued += 1
+            job_id = self.issued
+            self.commands.put((job_id, command, params))
+        return job_id
+
+    def depth(self):
+        '''Number of commands waiting, not counting the one playing.'''
+        return self.commands.qsize()
+
+    def status(self, job_id):
+        if job_id <= self.done:
+            return 'done'
+        if job_id == self.current:
+            return 'running'
+        if job_id <= self.issued:
+            return 'queued'
+        return 'unknown'
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            job_id, command, params = item
+            self.current = job_id
+            try:
+                getattr(self, command)(**params)
+            except Exception:
+                # one bad job must not take the worker, and the job ids, with it
+                log.exception('led job %d (%s) failed', job_id, command)
+                GPIO.output(self.pin, GPIO.LOW)
+            finally:
+                self.done = job_id
+
+        GPIO.output(self.pin, GPIO.LOW)
+        GPIO.cleanup(self.pin)
+
+    def stop(self):
+        '''Abandon queued commands, turn the LED off and release the pin.'''
+        self.stopped.set()
+        self.commands.put(None)
+        self.join()
+
+    def wait(self, seconds):
+        # returns early on stop
+        self.stopped.wait(seconds)
+
+    def on(self):
+        GPIO.output(self.pin, GPIO.HIGH)
 
-        # start with LED off
-        GPIO.output(18, GPIO.LOW)
+    def off(self):
+        GPIO.output(self.pin, GPIO.LOW)
 
-        # main
-        GPIO.output(18, GPIO.HIGH)
-        time.sleep(2)
-        GPIO.output(18, GPIO.LOW)
+    def blink(self, count=1, on=2.0, off=0.5):
+        for i in range(count):
+            if self.stopped.is_set():
+                return
+            GPIO.output(self.pin, GPIO.HIGH)
+            self.wait(on)
+            GPIO.output(self.pin, GPIO.LOW)
+            if i < count - 1:
+                self.wait(off)
 
-        # clean up at end of program
-        GPIO.cleanup()
+    def pattern(self, steps):
+        '''Play (state, seconds) steps, then leave the LED off.'''
+        for state, seconds in steps:
+            if self.stopped.is_set():
+                break
+            GPIO.output(self.pin, GPIO.HIGH if state else GPIO.LOW)
+            self.wait(seconds)
+        GPIO.output(self.pin, GPIO.LOW)
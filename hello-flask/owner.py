@@ -0,0 +1,90 @@
+'''One process that owns the GPIO for every server worker process.
+
+With several worker processes, each one starting its own LEDController and
+SensorHub would number LED jobs on its own, race the others on the pin and
+run a sampler per worker. serve.py instead starts this owner process
+before forking the workers. The LED worker and the sensor sampler live
+only here, and LEDController.get() and SensorHub.get() in a worker return
+proxies that call them over a unix socket. So job ids are unique and
+resolvable from any worker, commands play in one order, and the sensors
+are sampled once.
+
+A proxy call costs a round trip to the owner. Connections are kept per
+thread, and the threaded WSGI server starts a thread per request, so
+there a /led request also pays for connecting, a fraction of a
+millisecond over the unix socket. Over TCP the small writes of the
+connection handshake would wait on delayed ACKs, some 40 ms per thread.
+Each /api/stream client holds one connection to the owner while it waits.
+'''
+import os
+import threading
+from multiprocessing import util
+from multiprocessing.managers import BaseManager
+
+# set in the workers' environment to the owner's address
+ADDRESS = 'HELLO_GPIO_OWNER'
+
+LED_METHODS = ('submit', 'depth', 'status')
+
+
+class Owner(BaseManager):
+    pass
+
+
+def register(owned):
+    '''Name the shared objects, with the callables that make them if `owned`.'''
+    from ledcontroller import LEDController
+    from sensors import HubProxy, SensorHub
+    Owner.register('led', LEDController.get if owned else None, exposed=LED_METHODS)
+    Owner.register('sensors', SensorHub.get if owned else None, proxytype=HubProxy)
+
+
+proxies = {}
+proxies_lock = threading.Lock()
+
+
+def address():
+    '''The owner's address if this is a worker process that has one.'''
+    return os.environ.get(ADDRESS)
+
+
+def proxy(name):
+    '''Proxy for the owner's `name` object, connected once per process.'''
+    with proxies_lock:
+        if name not in proxies:
+            register(owned=False)
+            manager = Owner(address=address())
+            manager.connect()
+            proxies[name] = getattr(manager, name)()
+        return proxies[name]
+
+
+def stop_all():
+    from ledcontroller import LEDController
+    from sensors import SensorHub
+    for controller in list(LEDController.controllers.values()):
+        if controller.is_alive():
+            controller.stop()
+    if SensorHub.hub is not None and SensorHub.hub.is_alive():
+        SensorHub.hub.stop()
+
+
+def on_start():
+    # the owner process leaves through multiprocessing, which skips atexit
+    util.Finalize(None, stop_all, exitpriority=10)
+
+
+def start():
+    '''Start the owner process and point worker processes started after it
+    at it. Call before forking or spawning the workers.
+
+    Returns:
+        Owner: Its manager, `shutdown()` stops the owner.
+    '''
+    # the objects are made on first use, in the owner process
+    register(owned=True)
+    # no address picks a fresh unix socket in a temporary directory
+    manager = Owner()
+    manager.start(on_start)
+    os.environ[ADDRESS] = manager.address
+    return manager
@@ -0,0 +1,40 @@
+'''Rendered pages cached until the minute changes.
+
+The index pages only change with a minute precision time string, so the
+same HTML can be served for the rest of the minute from a dict lookup.
+'''
+import time
+from flask import render_template
+
+
+class PageCache:
+
+    def __init__(self):
+        self.pages = {}
+        self.minute = None
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, template, **context):
+        '''`render_template(template, **context)`, rendered at most once a minute.
+
+        Context values must be hashable, they are part of the key.
+        '''
+        minute = int(time.time() // 60)
+        if minute != self.minute:
+            # every page from last minute is stale, not just the one asked for
+            self.pages = {}
+            self.minute = minute
+
+        key = (template, tuple(sorted(context.items())))
+        html = self.pages.get(key)
+        if html is not None:
+            self.hits += 1
+            return html
+
+        self.misses += 1
+        html = self.pages[key] = render_template(template, **context)
+        return html
+
+    def stats(self):
+        return {'pages': len(self.pages), 'hits': self.hits, 'misses': self.misses}
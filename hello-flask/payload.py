@@ -0,0 +1,100 @@
+'''Static files served from memory with conditional GET support.
+
+A Payload reads its file once, keeps the body and a gzipped copy, and only
+stats the file again every `check_every` seconds to pick up edits. Polls
+that already have the current version get a 304 from a header comparison.
+'''
+from collections import namedtuple
+import datetime
+import gzip
+import hashlib
+import os
+import threading
+import time
+from flask import Response
+from werkzeug.http import http_date, parse_accept_header, parse_date, parse_etags, quote_etag
+
+Snapshot = namedtuple('Snapshot', ['key', 'body', 'gzipped', 'etag', 'last_modified'])
+
+
+class Payload:
+
+    def __init__(self, path, mimetype='application/json', check_every=1.0):
+        '''
+        Args:
+            path (str): File to serve.
+            mimetype (str): Content type of the file.
+            check_every (float): Seconds between checks for a changed file.
+        '''
+        self.path = path
+        self.mimetype = mimetype
+        self.check_every = check_every
+        self.snapshot = None
+        self.checked = None
+        self.lock = threading.Lock()
+        self.reads = 0
+
+    def current(self):
+        '''The latest Snapshot, reading the file again only if it changed.'''
+        now = time.monotonic()
+        if self.snapshot is not None and now - self.checked < self.check_every:
+            return self.snapshot
+        with self.lock:
+            if self.snapshot is None or now - self.checked >= self.check_every:
+                self.refresh()
+                self.checked = now
+        return self.snapshot
+
+    def refresh(self):
+        st = os.stat(self.path)
+        key = (st.st_mtime_ns, st.st_size)
+        if self.snapshot is not None and self.snapshot.key == key:
+            return
+        with open(self.path, 'rb') as f:
+            body = f.read()
+        self.reads += 1
+        # swapped in whole, so readers never see a half updated snapshot
+        self.snapshot = Snapshot(
+            key=key,
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=9),
+            etag=hashlib.sha1(body).hexdigest()[:20],
+            last_modified=datetime.datetime.fromtimestamp(int(st.st_mtime), datetime.timezone.utc),
+        )
+
+    def conditional(self, headers):
+        '''Status, body and headers answering a GET with request `headers`.
+
+        A 304 with no body if the client has the current version, else the
+        body, gzipped if the client accepts it.
+        '''
+        snapshot = self.current()
+        # the gzipped body is a different representation, so it gets its own tag
+        use_gzip = parse_accept_header(headers.get('Accept-Encoding'))['gzip'] > 0
+        etag = snapshot.etag + '-gz' if use_gzip else snapshot.etag
+
+        if_none_match = parse_etags(headers.get('If-None-Match'))
+        if if_none_match:
+            not_modified = if_none_match.contains(snapshot.etag) or if_none_match.contains(snapshot.etag + '-gz')
+        else:
+            since = parse_date(headers.get('If-Modified-Since'))
+            not_modified = since is not None and snapshot.last_modified <= since
+
+        response_headers = [
+            ('ETag', quote_etag(etag)),
+            ('Last-Modified', http_date(snapshot.last_modified)),
+            ('Vary', 'Accept-Encoding'),
+            # clients may keep it but must check back, which is a cheap 304
+            ('Cache-Control', 'no-cache'),
+        ]
+        if not_modified:
+            return 304, b'', response_headers
+
+        response_headers.append(('Content-Type', self.mimetype))
+        if use_gzip:
+            response_headers.append(('Content-Encoding', 'gzip'))
+        return 200, snapshot.gzipped if use_gzip else snapshot.body, response_headers
+
+    def response(self, request):
+        status, body, headers = self.conditional(request.headers)
+        return Response(body, status=status, headers=headers)
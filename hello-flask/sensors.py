@@ -0,0 +1,150 @@
+'''One sampler thread for the sensor pins, shared by every stream client.
+
+The hub reads each pin once per tick no matter how many clients are
+listening. On a change it appends the new state to a short history and
+wakes the waiting clients, which read from that one shared history, so
+each extra client costs a waiting thread and a sequence number, not
+another queue or another GPIO read.
+'''
+from collections import deque
+import json
+from multiprocessing.managers import BaseProxy
+import threading
+import time
+import owner
+from gpio import GPIO
+
+# hello-gpio/motion.py and light-sensor.py both wire their sensor to pin 17
+SENSORS = {'motion': 17, 'light': 17}
+
+
+class SensorHub(threading.Thread):
+
+    hub = None
+    hub_lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        '''The hub for SENSORS, set up and started on first use in this process.'''
+        if owner.address():
+            return owner.proxy('sensors')
+        with cls.hub_lock:
+            if cls.hub is None or not cls.hub.is_alive():
+                cls.hub = cls(SENSORS)
+                cls.hub.start()
+        return cls.hub
+
+    def __init__(self, sensors, rate=20, history=64, read=None):
+        '''
+        Args:
+            sensors (dict): Sensor name -> BCM input pin.
+            rate (float): Samples per second.
+            history (int): Changes kept for clients that fall behind.
+            read (callable): pin -> value, defaults to GPIO.input.
+        '''
+        super().__init__(daemon=True)
+        self.sensors = sensors
+        self.period = 1 / rate
+        self.read = read or GPIO.input
+        self.stopped = threading.Event()
+
+        self.changed = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.seq = 0
+        self.state = None
+        self.reads = 0
+
+        if read is None:
+            GPIO.setmode(GPIO.BCM)
+            for pin in set(sensors.values()):
+                GPIO.setup(pin, GPIO.IN)
+
+    def sample(self):
+        # sensors sharing a pin share the read
+        values = {pin: self.read(pin) for pin in set(self.sensors.values())}
+        self.reads += len(values)
+        return {name: int(values[pin]) for name, pin in self.sensors.items()}
+
+    def run(self):
+        deadline = time.monotonic()
+        while not self.stopped.is_set():
+            state = self.sample()
+            if state != self.state:
+                self.publish(state)
+            deadline += self.period
+            self.stopped.wait(max(deadline - time.monotonic(), 0))
+
+        with self.changed:
+            self.changed.notify_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def publish(self, state):
+        with self.changed:
+            self.seq += 1
+            # serialized once here rather than once per client
+            data = json.dumps({'seq': self.seq, 'time': time.time(), 'state': state})
+            self.events.append((self.seq, data))
+            self.state = state
+            self.changed.notify_all()
+
+    def first_seq(self, last_seq=None):
+        '''Where a subscriber resuming after `last_seq` starts, before the
+        current state if there is no `last_seq` or it is from another run.
+        '''
+        with self.changed:
+            if last_seq is None or last_seq > self.seq:
+                last_seq = self.seq - 1 if self.events else self.seq
+        return last_seq
+
+    def changes(self, last_seq, timeout):
+        '''The (seq, json) changes after `last_seq`, waiting up to `timeout`
+        seconds for one. None on timeout, an empty list once stopped.
+        '''
+        with self.changed:
+            if not self.changed.wait_for(lambda: self.seq > last_seq or self.stopped.is_set(), timeout):
+                return None
+            return [event for event in self.events if event[0] > last_seq]
+
+    def subscribe(self, last_seq=None, keepalive=15.0):
+        '''Yield (seq, json) for each change after `last_seq`, or None every
+        `keepalive` seconds without one. Without `last_seq` the current state
+        comes first.
+        '''
+        last_seq = self.first_seq(last_seq)
+        while True:
+            pending = self.changes(last_seq, keepalive)
+            if pending is None:
+                yield None
+                continue
+            if not pending:
+                return
+            for event in pending:
+                last_seq = event[0]
+                yield event
+
+    def sse(self, last_seq=None, keepalive=15.0):
+        '''`subscribe` as a text/event-stream body.'''
+        yield 'retry: 2000\n\n'
+        for event in self.subscribe(last_seq, keepalive):
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield 'id: %d\nevent: state\ndata: %s\n\n' % event
+
+
+class HubProxy(BaseProxy):
+    '''A SensorHub in the owner process, streamed from here in the worker.'''
+
+    _exposed_ = ('first_seq', 'changes')
+
+    def first_seq(self, last_seq=None):
+        return self._callmethod('first_seq', (last_seq,))
+
+    def changes(self, last_seq, timeout):
+        return self._callmethod('changes', (last_seq, timeout))
+
+    subscribe = SensorHub.subscribe
+    sse = SensorHub.sse
@@ -0,0 +1,114 @@
+'''Serve hello-flask with several worker processes.
+
+The default WSGI mode opens one listening socket and pre-forks N
+processes, each running a threaded werkzeug server on it, so the kernel
+spreads connections across them. --asgi pre-forks the same way with a
+uvicorn server running asgi.app in each (pip install -r requirements-asgi.txt).
+
+With more than one worker, the LED worker and the sensor sampler run in
+a separate owner process that the workers call, see owner.py, so job ids
+stay unique and the pin has one user. The default is a single worker.
+
+Usage:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 4000] [--asgi] [--fake-gpio]
+'''
+import logging
+import os
+import signal
+import socket
+import sys
+
+def listen(host, port, backlog=128):
+    '''The listening socket every worker process accepts on.
+
+    Made with an explicit IPPROTO_TCP: asyncio only sets TCP_NODELAY on
+    connections whose socket says it is TCP, and without it uvicorn's small
+    writes wait some 40 ms on delayed ACKs.
+    '''
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def prefork(serve, workers):
+    '''Run `serve()` in `workers` forked processes until they exit or this
+    one is stopped. The GPIO owner process is started first, see owner.py.
+    '''
+    if workers == 1:
+        serve()
+        return
+
+    # fork before any GPIO or sampler thread exists, they start on first use
+    # and only in the owner
+    import owner
+    manager = owner.start()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                serve()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        manager.shutdown()
+
+
+def serve_wsgi(host, port, workers):
+    from werkzeug.serving import make_server
+    from app import app
+
+    # one line per request to stderr costs more than the routes themselves
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    sock = listen(host, port)
+    prefork(lambda: make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever(), workers)
+
+
+def serve_asgi(host, port, workers):
+    import uvicorn
+    sock = listen(host, port)
+    # asgi.app is imported in each worker after the fork
+    config = uvicorn.Config('asgi:app', log_level='warning', access_log=False)
+    prefork(lambda: uvicorn.Server(config).run(sockets=[sock]), workers)
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--asgi', action='store_true', help='serve asgi.app under uvicorn')
+    parser.add_argument('--fake-gpio', action='store_true', help='use hello-gpio/fakegpio.py, e.g. for benchmarks')
+    args = parser.parse_args()
+
+    if args.fake_gpio:
+        # read by gpio.py, here and in the worker processes
+        os.environ['FAKE_GPIO'] = '1'
+    if args.asgi:
+        serve_asgi(args.host, args.port, args.workers)
+    else:
+        serve_wsgi(args.host, args.port, args.workers)
@@ -0,0 +1,113 @@
+'''Load test for /api/stream: does the cost stay flat as subscribers grow?
+
+Serves the app on a local port with a hub fed by a synthetic square wave,
+then keeps adding SSE clients. For each level it prints CPU use, resident
+memory, GPIO reads per second and events delivered per second. GPIO reads
+should not move with the number of clients, and memory should grow only
+by the per-connection thread.
+
+Usage:
+    python streamload.py [seconds per level] [levels...]
+'''
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+from werkzeug.serving import make_server
+
+# the sampler reads a synthetic wave, and nothing here needs the real pins
+os.environ.setdefault('FAKE_GPIO', '1')
+import app
+from sensors import SENSORS, SensorHub
+
+
+def square_wave(hz):
+    '''A pin reader that flips every sensor `2 * hz` times a second.'''
+    def read(pin):
+        return int(time.monotonic() * hz * 2) % 2
+    return read
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+class Clients(threading.Thread):
+    '''SSE connections read from one thread with a selector.'''
+
+    def __init__(self, port):
+        super().__init__(daemon=True)
+        self.port = port
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.events = 0
+        self.count = 0
+
+    def add(self, n):
+        for _ in range(n):
+            sock = socket.create_connection(('127.0.0.1', self.port))
+            sock.sendall(b'GET /api/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+            sock.setblocking(False)
+            with self.lock:
+                self.selector.register(sock, selectors.EVENT_READ)
+                self.count += 1
+
+    def run(self):
+        while True:
+            with self.lock:
+                ready = self.selector.select(timeout=0) if self.count else []
+            if not ready:
+                time.sleep(0.01)
+                continue
+            for key, _ in ready:
+                data = key.fileobj.recv(65536)
+                self.events += data.count(b'event: state')
+
+
+def measure(hub, clients, seconds):
+    reads, events = hub.reads, clients.events
+    cpu, wall = time.process_time(), time.monotonic()
+    time.sleep(seconds)
+    cpu, wall = time.process_time() - cpu, time.monotonic() - wall
+    return {
+        'clients': clients.count,
+        'cpu_pct': 100 * cpu / wall,
+        'rss_mb': rss_mb(),
+        'gpio_reads_per_s': (hub.reads - reads) / wall,
+        'events_per_s': (clients.events - events) / wall,
+    }
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    levels = [int(n) for n in sys.argv[2:]] or [0, 10, 50, 100, 200]
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    hub = SensorHub(SENSORS, read=square_wave(hz=2))
+    hub.start()
+    SensorHub.hub = hub
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    clients = Clients(server.server_port)
+    clients.start()
+
+    print('%8s %8s %8s %16s %12s' % ('clients', 'cpu %', 'rss MB', 'gpio reads/s', 'events/s'))
+    for level in levels:
+        clients.add(level - clients.count)
+        time.sleep(0.5)
+        row = measure(hub, clients, seconds)
+        print('%(clients)8d %(cpu_pct)8.1f %(rss_mb)8.1f %(gpio_reads_per_s)16.1f %(events_per_s)12.1f' % row)
+
+    server.shutdown()
+    os._exit(0)
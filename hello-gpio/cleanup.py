@@ -1,4 +1,7 @@
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
 
 GPIO.setwarnings(False)
 GPIO.cleanup()
@@ -0,0 +1,151 @@
+'''Sensor pins watched with GPIO edge interrupts instead of polling.
+
+Polling pin 17 every few seconds misses motion for up to a poll period and
+wakes the CPU whether or not anything happened. Here the kernel reports
+each edge, RPi.GPIO's callback thread stamps it and queues it, and one
+dispatch thread calls the rise or fall handler. Nothing runs while the
+pins are quiet.
+
+Edges inside a pin's bouncetime are dropped before the callback, so a
+bounce can leave the pin at another level than the last edge reported.
+Each edge therefore also re-reads its pin once the bouncetime is over,
+and a level that differs from the last one dispatched is handled as an
+edge of its own.
+
+Usage:
+    python edges.py --check  # bounce waveforms through fakegpio.py, off the Pi
+
+The latency recorded for each edge is from the callback stamping it to
+its handler starting, i.e. how long handlers wait behind each other.
+'''
+from collections import namedtuple
+import queue
+import threading
+import time
+import numpy as np
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
+
+Edge = namedtuple('Edge', ['name', 'pin', 'value', 'time'])
+
+
+class EdgeWatcher(threading.Thread):
+
+    def __init__(self, size=1024):
+        '''
+        Args:
+            size (int): Latencies kept for `stats`, the most recent ones.
+        '''
+        super().__init__(daemon=True)
+        self.edges = queue.Queue()
+        self.handlers = {}
+        self.levels = {}
+        self.bouncetimes = {}
+        self.settles = {}
+
+        self.latencies = np.zeros(size)
+        self.count = 0
+
+        # use broadcomm GPIO naming schema
+        GPIO.setmode(GPIO.BCM)
+
+    def watch(self, pin, name=None, on_rise=None, on_fall=None, bouncetime=50):
+        '''Call `on_rise(edge)` / `on_fall(edge)` when `pin` goes high / low.
+
+        Args:
+            bouncetime (int): Milliseconds after an edge in which further
+                edges on the pin are ignored.
+        '''
+        GPIO.setup(pin, GPIO.IN)
+        self.levels[pin] = GPIO.input(pin)
+        self.handlers[pin] = (name or str(pin), on_rise, on_fall)
+        self.bouncetimes[pin] = bouncetime / 1000
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=self.on_edge, bouncetime=bouncetime)
+
+    def level(self, pin):
+        return self.levels[pin]
+
+    def on_edge(self, pin):
+        # runs on RPi.GPIO's callback thread, so only stamp and queue
+        self.edges.put((pin, GPIO.input(pin), time.monotonic()))
+
+        # edges are ignored until the bouncetime is over, read the pin again then
+        settle = threading.Timer(self.bouncetimes[pin] + 0.001, self.settle, (pin,))
+        settle.daemon = True
+        previous, self.settles[pin] = self.settles.get(pin), settle
+        if previous is not None:
+            previous.cancel()
+        settle.start()
+
+    def settle(self, pin):
+        self.edges.put((pin, GPIO.input(pin), time.monotonic()))
+
+    def run(self):
+        while True:
+            item = self.edges.get()
+            if item is None:
+                return
+            pin, value, edge_time = item
+            # a bounce that settled where it started, or a settled read that
+            # matches the last edge, is not a change
+            if value == self.levels[pin]:
+                continue
+            self.levels[pin] = value
+
+            name, on_rise, on_fall = self.handlers[pin]
+            handler = on_rise if value else on_fall
+            self.latencies[self.count % self.latencies.size] = time.monotonic() - edge_time
+            self.count += 1
+            if handler is not None:
+                handler(Edge(name, pin, value, edge_time))
+
+    def stop(self):
+        for pin in self.handlers:
+            GPIO.remove_event_detect(pin)
+        for settle in list(self.settles.values()):
+            settle.cancel()
+        self.edges.put(None)
+        self.join()
+
+    def stats(self):
+        latencies = self.latencies[:min(self.count, self.latencies.size)] * 1000
+        if not latencies.size:
+            return {'edges': 0}
+        return {
+            'edges': self.count,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+        }
+
+
+def check():
+    '''A rise that bounces low inside the bouncetime and stays there, then a
+    real rise and fall, reach the handlers as rise, fall, rise, fall.
+    '''
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(17, GPIO.IN)
+    GPIO.drive(17, 0)
+    seen = []
+    watcher = EdgeWatcher()
+    watcher.watch(
+        17, on_rise=lambda edge: seen.append(('r', edge.value)),
+        on_fall=lambda edge: seen.append(('f', edge.value)), bouncetime=50,
+    )
+    watcher.start()
+    GPIO.script(17, [(0.01, 1), (0.022, 0), (0.3, 1), (0.4, 0)]).join()
+    time.sleep(0.1)
+    watcher.stop()
+    GPIO.cleanup()
+    assert seen == [('r', 1), ('f', 0), ('r', 1), ('f', 0)], seen
+    return seen
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    if sys.argv[1:] == ['--check']:
+        print('ok', check())
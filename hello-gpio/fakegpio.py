@@ -0,0 +1,301 @@
+'''Simulated RPi.GPIO so pin code runs, and can be timed, off the Pi.
+
+It has the calls the scripts here use, with the same arguments. Every
+level change, output or input, is logged with its monotonic time to a
+NumPy history. Inputs are driven by `drive` or by scripted waveforms,
+which fire `add_event_detect` callbacks like the real edge thread, and
+`set_latency` makes each output take a while, like a slow bus would.
+
+Scripts fall back to this module when RPi.GPIO can't be imported. Call
+`install()` before anything imports RPi.GPIO to force it on a Pi.
+
+Usage:
+    python fakegpio.py
+'''
+import sys
+import threading
+import time
+import types
+import numpy as np
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+HISTORY = np.dtype([('time', 'f8'), ('pin', 'i2'), ('value', 'f4')])
+
+mode = None
+warnings = True
+latency = 0.0
+pins = {}
+directions = {}
+detectors = {}
+players = {}
+lock = threading.RLock()
+
+log = np.zeros(1024, dtype=HISTORY)
+logged = 0
+
+
+def install():
+    '''Make `import RPi.GPIO` return this module.'''
+    package = sys.modules.get('RPi') or types.ModuleType('RPi')
+    package.GPIO = sys.modules[__name__]
+    sys.modules['RPi'] = package
+    sys.modules['RPi.GPIO'] = sys.modules[__name__]
+
+
+def record(channel, value, when=None):
+    global log, logged
+    with lock:
+        if logged == log.size:
+            log = np.concatenate([log, np.zeros(log.size, dtype=HISTORY)])
+        log[logged] = (time.monotonic() if when is None else when, channel, value)
+        logged += 1
+
+
+def history(channel=None):
+    '''Logged (time, pin, value) records, oldest first, for one pin or all.'''
+    with lock:
+        records = log[:logged].copy()
+    return records if channel is None else records[records['pin'] == channel]
+
+
+def reset_history():
+    global logged
+    with lock:
+        logged = 0
+
+
+def set_latency(seconds):
+    '''Make every `output` take `seconds`, spun rather than slept so short
+    latencies are honored.'''
+    global latency
+    latency = seconds
+
+
+def channels(channel):
+    return channel if isinstance(channel, (list, tuple)) else [channel]
+
+
+def setmode(new_mode):
+    global mode
+    if mode is not None and new_mode != mode:
+        raise ValueError('A different mode has already been set!')
+    mode = new_mode
+
+
+def getmode():
+    return mode
+
+
+def setwarnings(flag):
+    global warnings
+    warnings = flag
+
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=None):
+    if mode is None:
+        raise RuntimeError('Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)')
+    for pin in channels(channel):
+        with lock:
+            directions[pin] = direction
+            if direction == OUT:
+                value = LOW if initial is None else int(bool(initial))
+            else:
+                value = pins.get(pin, HIGH if pull_up_down == PUD_UP else LOW)
+            pins[pin] = value
+        record(pin, value)
+
+
+def output(channel, value):
+    values = value if isinstance(value, (list, tuple)) else [value] * len(channels(channel))
+    for pin, value in zip(channels(channel), values):
+        if directions.get(pin) != OUT:
+            raise RuntimeError('The GPIO channel has not been set up as an OUTPUT')
+        if latency:
+            deadline = time.perf_counter() + latency
+            while time.perf_counter() < deadline:
+                pass
+        value = int(bool(value))
+        with lock:
+            pins[pin] = value
+        record(pin, value)
+
+
+def input(channel):
+    if channel not in directions:
+        raise RuntimeError('You must setup() the GPIO channel first')
+    return pins[channel]
+
+
+def drive(channel, value, when=None):
+    '''Set an input's level from outside, firing edge detection as the
+    kernel would.'''
+    value = int(bool(value))
+    with lock:
+        old = pins.get(channel, LOW)
+        pins[channel] = value
+    when = time.monotonic() if when is None else when
+    record(channel, value, when)
+    if old != value:
+        edge(channel, value, when)
+
+
+def edge(channel, value, when):
+    detector = detectors.get(channel)
+    if detector is None:
+        return
+    if detector['edge'] == RISING and not value or detector['edge'] == FALLING and value:
+        return
+    # like RPi.GPIO, edges within bouncetime of the last one are dropped
+    if detector['last'] is not None and (when - detector['last']) * 1000 < detector['bouncetime']:
+        return
+    detector['last'] = when
+    detector['detected'] = True
+    for callback in list(detector['callbacks']):
+        callback(channel)
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    if directions.get(channel) != IN:
+        raise RuntimeError('You must setup() the GPIO channel as an input first')
+    if channel in detectors:
+        raise RuntimeError('Conflicting edge detection already enabled for this GPIO channel')
+    detectors[channel] = {
+        'edge': edge,
+        'bouncetime': bouncetime or 0,
+        'callbacks': [callback] if callback else [],
+        'last': None,
+        'detected': False,
+    }
+
+
+def add_event_callback(channel, callback):
+    detectors[channel]['callbacks'].append(callback)
+
+
+def remove_event_detect(channel):
+    detectors.pop(channel, None)
+
+
+def event_detected(channel):
+    detector = detectors.get(channel)
+    if detector is None or not detector['detected']:
+        return False
+    detector['detected'] = False
+    return True
+
+
+def script(channel, waveform, repeat=False):
+    '''Play (seconds from now, level) steps into an input on a thread.
+
+    Steps are scheduled against absolute deadlines, so they don't drift.
+
+    Returns:
+        threading.Thread: The player, finished when the waveform is.
+    '''
+    stopped = threading.Event()
+
+    def play():
+        start = time.monotonic()
+        while True:
+            for offset, value in waveform:
+                when = start + offset
+                if stopped.wait(max(when - time.monotonic(), 0)):
+                    return
+                drive(channel, value, when)
+            if not repeat:
+                return
+            start += waveform[-1][0]
+
+    stop_script(channel)
+    player = threading.Thread(target=play, daemon=True)
+    player.stopped = stopped
+    players[channel] = player
+    player.start()
+    return player
+
+
+def stop_script(channel):
+    player = players.pop(channel, None)
+    if player is not None:
+        player.stopped.set()
+        if player is not threading.current_thread():
+            player.join()
+
+
+def cleanup(channel=None):
+    global mode
+    for pin in channels(channel) if channel is not None else list(directions):
+        stop_script(pin)
+        detectors.pop(pin, None)
+        directions.pop(pin, None)
+        pins.pop(pin, None)
+    if channel is None:
+        mode = None
+
+
+class PWM:
+
+    def __init__(self, channel, frequency):
+        if directions.get(channel) != OUT:
+            raise RuntimeError('You must setup() the GPIO channel as an output first')
+        self.channel = channel
+        self.frequency = frequency
+        self.duty_cycle = 0.0
+        self.running = False
+
+    def start(self, duty_cycle):
+        self.running = True
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        if not 0 <= duty_cycle <= 100:
+            raise ValueError('dutycycle must have a value from 0.0 to 100.0')
+        self.duty_cycle = duty_cycle
+        if self.running:
+            # logged as the mean level, 0 to 1
+            record(self.channel, duty_cycle / 100)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+        record(self.channel, 0.0)
+
+
+if __name__ == '__main__':
+
+    # how fast can a control loop toggle a pin as each write gets slower?
+    setmode(BCM)
+    setup(18, OUT)
+    for write_latency in (0, 1e-5, 1e-4):
+        set_latency(write_latency)
+        reset_history()
+        start = time.perf_counter()
+        for i in range(2000):
+            output(18, i % 2)
+        elapsed = time.perf_counter() - start
+        times = history(18)['time']
+        print('write latency %6.0f us: %8.0f toggles/s, period jitter %.1f us' % (
+            write_latency * 1e6, 2000 / elapsed, 1e6 * np.diff(times).std()))
+    set_latency(0)
+
+    # a scripted input through edge detection
+    setup(17, IN)
+    edges = []
+    add_event_detect(17, BOTH, callback=lambda pin: edges.append((time.monotonic(), input(pin))), bouncetime=5)
+    script(17, [(0.01, 1), (0.011, 0), (0.05, 0), (0.06, 1), (0.1, 0)]).join()
+    print('waveform 1, bounce, 1, 0 -> edges seen', [value for _, value in edges])
+    cleanup()
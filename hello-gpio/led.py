@@ -1,38 +1,42 @@
-import RPi.GPIO as GPIO
-import time
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
+from patterns import PatternPlayer, blinks, breathe, morse
 
-# use broadcomm GPIO naming schema
-GPIO.setmode(GPIO.BCM)
+# a number blinks that many times, `morse TEXT` spells TEXT, `breathe`
+# fades in and out, `now ...` cuts the current pattern short, x quits
+player = PatternPlayer(18)
+player.start()
 
-# setup GPIO pin 18 as an output
-GPIO.setup(18, GPIO.OUT)
-
-# start with LED off
-GPIO.output(18, GPIO.LOW)
-
-state = 0
 while True:
     in_ = input()
-    
+
     if in_ == 'x':
+        # finish what was asked for, as when every blink blocked
+        player.join_queue()
         break
 
-    try:
-        c = int(in_)
-    except:
-        c = 1
-
-
-    for _ in range(2 * c):
-        
-        if state == 0:
-            GPIO.output(18, GPIO.HIGH)
-            state = 1
-        else:
-            GPIO.output(18, GPIO.LOW)
-            state = 0
-        time.sleep(0.1)
-
+    interrupt = in_.startswith('now ')
+    if interrupt:
+        in_ = in_[len('now '):]
+
+    if in_.startswith('morse '):
+        pattern = morse(in_[len('morse '):])
+    elif in_ == 'breathe':
+        pattern = breathe()
+    else:
+        try:
+            c = int(in_)
+        except ValueError:
+            c = 1
+        pattern = blinks(c)
+
+    # plays in the background, so the next line can be typed straight away
+    player.play(pattern, interrupt=interrupt)
+
+player.stop()
+print(player.stats())
 
 # clean up at end of program
 GPIO.cleanup()
@@ -1,5 +1,12 @@
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
+import signal
+import sys
 import time
+from edges import EdgeWatcher
+from tslog import SeriesLog
 
 LED = 18
 LIGHT_SENSOR = 17
@@ -8,7 +15,6 @@ LIGHT_SENSOR = 17
 GPIO.setmode(GPIO.BCM)
 
 # setup GPIO pin 18 as an output
-GPIO.setup(LIGHT_SENSOR, GPIO.IN)
 GPIO.setup(LED, GPIO.OUT)
 
 # start with LED off
@@ -18,16 +24,41 @@ for _ in range(5):
     GPIO.output(LED, GPIO.LOW)
     time.sleep(0.25)
 
-while True:
-    res = GPIO.input(LIGHT_SENSOR)
-    if res == 1:
-        GPIO.output(LED, GPIO.HIGH)
-        print(res, 'on')
-    else:
-        GPIO.output(LED, GPIO.LOW)
-        print(res, 'off')
-    time.sleep(1)
 
+def on(edge):
+    GPIO.output(LED, GPIO.HIGH)
+    log.append(edge.pin, edge.value, edge.time)
+
+
+def off(edge):
+    GPIO.output(LED, GPIO.LOW)
+    log.append(edge.pin, edge.value, edge.time)
+
+
+# every change is written through as it happens, see `python tslog.py light.npy` for rollups
+log = SeriesLog('light.npy', batch=1)
+
+# react to the sensor's edges instead of polling it every second
+watcher = EdgeWatcher()
+# stamped before the level is read, so no edge can be logged earlier
+started = time.monotonic()
+watcher.watch(LIGHT_SENSOR, 'light', on_rise=on, on_fall=off)
+
+# logged before the dispatch thread runs, which is the only one that logs after this
+GPIO.output(LED, GPIO.HIGH if watcher.level(LIGHT_SENSOR) else GPIO.LOW)
+log.append(LIGHT_SENSOR, watcher.level(LIGHT_SENSOR), started)
+watcher.start()
+
+# stopped by a service manager as well as by Ctrl-C
+signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+try:
+    signal.pause()
+except KeyboardInterrupt:
+    pass
+finally:
+    watcher.stop()
+    log.close()
+    print(watcher.stats())
 
-# clean up at end of program
-GPIO.cleanup()
+    # clean up at end of program
+    GPIO.cleanup()
@@ -1,26 +1,58 @@
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
+import signal
+import sys
 import time
+from edges import EdgeWatcher
+from tslog import SeriesLog
+
+LED = 18
+MOTION_SENSOR = 17
 
 # use broadcomm GPIO naming schema
 GPIO.setmode(GPIO.BCM)
 
 # setup GPIO pin 18 as an output
-GPIO.setup(17, GPIO.IN)
-GPIO.setup(18, GPIO.OUT)
+GPIO.setup(LED, GPIO.OUT)
+
+
+def on(edge):
+    GPIO.output(LED, GPIO.HIGH)
+    log.append(edge.pin, edge.value, edge.time)
+
+
+def off(edge):
+    GPIO.output(LED, GPIO.LOW)
+    log.append(edge.pin, edge.value, edge.time)
+
+
+# every change is written through as it happens, see `python tslog.py motion.npy` for rollups
+log = SeriesLog('motion.npy', batch=1)
 
-# start with LED off
-GPIO.output(18, GPIO.LOW)
+# react to the sensor's edges instead of polling it every 3 s
+watcher = EdgeWatcher()
+# stamped before the level is read, so no edge can be logged earlier
+started = time.monotonic()
+watcher.watch(MOTION_SENSOR, 'motion', on_rise=on, on_fall=off)
 
-while True:
-    res = GPIO.input(17)
-    if res == 1:
-        GPIO.output(18, GPIO.HIGH)
-        print(res, 'on')
-    else:
-        GPIO.output(18, GPIO.LOW)
-        print(res, 'off')
-    time.sleep(3)
+# start with the LED showing the sensor, logged before the dispatch
+# thread runs, which is the only one that logs after this
+GPIO.output(LED, GPIO.HIGH if watcher.level(MOTION_SENSOR) else GPIO.LOW)
+log.append(MOTION_SENSOR, watcher.level(MOTION_SENSOR), started)
+watcher.start()
 
+# stopped by a service manager as well as by Ctrl-C
+signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+try:
+    signal.pause()
+except KeyboardInterrupt:
+    pass
+finally:
+    watcher.stop()
+    log.close()
+    print(watcher.stats())
 
-# clean up at end of program
-GPIO.cleanup()
+    # clean up at end of program
+    GPIO.cleanup()
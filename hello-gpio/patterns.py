@@ -0,0 +1,211 @@
+'''Blink patterns compiled to timed transitions and played on deadlines.
+
+A pattern is a list of (seconds from its start, duty cycle 0-100) steps.
+Counts and Morse only switch the LED fully on or off, breathe and fade
+step its brightness through GPIO.PWM.
+
+One PatternPlayer thread owns the pin and plays queued patterns one after
+another. Each step's deadline is absolute, start of pattern plus offset
+on the monotonic clock, so time spent in one step never shifts the next.
+The thread sleeps until just before a deadline and spins the rest of the
+way, and the error of every step is recorded. Another busy Python thread
+can still hold the GIL past a deadline, by up to sys.getswitchinterval().
+
+Usage:
+    python patterns.py
+'''
+from collections import deque, namedtuple
+import math
+import threading
+import time
+import numpy as np
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    import fakegpio as GPIO
+
+Pattern = namedtuple('Pattern', ['name', 'steps', 'duration', 'pwm'])
+
+MORSE = {
+    'a': '.-', 'b': '-...', 'c': '-.-.', 'd': '-..', 'e': '.', 'f': '..-.', 'g': '--.', 'h': '....',
+    'i': '..', 'j': '.---', 'k': '-.-', 'l': '.-..', 'm': '--', 'n': '-.', 'o': '---', 'p': '.--.',
+    'q': '--.-', 'r': '.-.', 's': '...', 't': '-', 'u': '..-', 'v': '...-', 'w': '.--', 'x': '-..-',
+    'y': '-.--', 'z': '--..', '0': '-----', '1': '.----', '2': '..---', '3': '...--', '4': '....-',
+    '5': '.....', '6': '-....', '7': '--...', '8': '---..', '9': '----.',
+}
+
+
+def blinks(count, on=0.1, off=0.1):
+    '''`count` blinks, on for `on` seconds and off for `off` after each.'''
+    steps = []
+    for i in range(count):
+        start = i * (on + off)
+        steps += [(start, 100), (start + on, 0)]
+    return Pattern('blinks', steps, count * (on + off), pwm=False)
+
+
+def morse(text, unit=0.1):
+    '''`text` in Morse code, a dot lasting `unit` seconds.'''
+    steps = []
+    t = 0.0
+    for word in text.lower().split():
+        for letter in word:
+            for symbol in MORSE.get(letter, ''):
+                length = unit if symbol == '.' else 3 * unit
+                steps += [(t, 100), (t + length, 0)]
+                t += length + unit
+            # three units between letters, one of them already waited
+            t += 2 * unit
+        # seven units between words, three of them already waited
+        t += 4 * unit
+    return Pattern('morse', steps, t, pwm=False)
+
+
+def fade(start, end, seconds=1.0, steps=50):
+    '''Brightness from `start` to `end` percent in even steps.'''
+    times = np.linspace(0, seconds, steps, endpoint=False)
+    duties = np.linspace(start, end, steps)
+    return Pattern('fade', list(zip(times.tolist(), duties.tolist())), seconds, pwm=True)
+
+
+def breathe(period=2.0, cycles=1, steps=50):
+    '''Brightness rising and falling on a raised cosine, `cycles` times.'''
+    times = np.arange(cycles * steps) * period / steps
+    duties = 50 * (1 - np.cos(2 * math.pi * times / period))
+    return Pattern('breathe', list(zip(times.tolist(), duties.tolist())), cycles * period, pwm=True)
+
+
+class PatternPlayer(threading.Thread):
+
+    def __init__(self, pin=18, frequency=200, spin=0.002, size=4096):
+        '''
+        Args:
+            pin (int): BCM pin of the LED.
+            frequency (float): PWM frequency for breathe and fade.
+            spin (float): Seconds before each deadline to stop sleeping and
+                spin, which sleep's wake up jitter has to fit in.
+            size (int): Timing errors kept for `stats`, the most recent ones.
+        '''
+        super().__init__(daemon=True)
+        self.pin = pin
+        self.spin = spin
+        self.queue = deque()
+        self.changed = threading.Condition()
+        self.stopped = False
+        self.interrupted = False
+        self.playing = None
+
+        self.errors = np.zeros(size)
+        self.count = 0
+
+        # use broadcomm GPIO naming schema
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, GPIO.LOW)
+        self.pwm = GPIO.PWM(pin, frequency)
+
+    def play(self, pattern, interrupt=False):
+        '''Queue `pattern` after the ones waiting, or cut them all short.'''
+        with self.changed:
+            if interrupt:
+                self.queue.clear()
+                self.interrupted = self.playing is not None
+            self.queue.append(pattern)
+            self.changed.notify_all()
+
+    def stop(self):
+        with self.changed:
+            self.queue.clear()
+            self.stopped = True
+            self.interrupted = True
+            self.changed.notify_all()
+        self.join()
+
+    def join_queue(self):
+        '''Block until every queued pattern has played.'''
+        with self.changed:
+            while self.queue or self.playing is not None:
+                self.changed.wait()
+
+    def wait_until(self, deadline):
+        '''Sleep, then spin, until `deadline`. False if interrupted first.'''
+        with self.changed:
+            while not self.interrupted:
+                remaining = deadline - self.spin - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            if self.interrupted:
+                return False
+        while time.monotonic() < deadline:
+            pass
+        return True
+
+    def run(self):
+        while True:
+            with self.changed:
+                while not self.queue and not self.stopped:
+                    self.changed.wait()
+                if self.stopped:
+                    break
+                pattern = self.playing = self.queue.popleft()
+                self.interrupted = False
+            self.play_steps(pattern)
+            with self.changed:
+                self.playing = None
+                self.changed.notify_all()
+
+        GPIO.output(self.pin, GPIO.LOW)
+
+    def play_steps(self, pattern):
+        if pattern.pwm:
+            self.pwm.start(0)
+        start = time.monotonic()
+        for offset, duty in pattern.steps:
+            deadline = start + offset
+            if not self.wait_until(deadline):
+                break
+            error = time.monotonic() - deadline
+            if pattern.pwm:
+                self.pwm.ChangeDutyCycle(duty)
+            else:
+                GPIO.output(self.pin, GPIO.HIGH if duty else GPIO.LOW)
+            self.errors[self.count % self.errors.size] = error
+            self.count += 1
+        else:
+            # hold the last step until the pattern's end, so patterns don't run together
+            self.wait_until(start + pattern.duration)
+
+        if pattern.pwm:
+            self.pwm.stop()
+        GPIO.output(self.pin, GPIO.LOW)
+
+    def stats(self):
+        '''Lateness of each transition against its deadline, in ms.'''
+        errors = self.errors[:min(self.count, self.errors.size)] * 1000
+        if not errors.size:
+            return {'transitions': 0}
+        return {
+            'transitions': self.count,
+            'mean_ms': float(errors.mean()),
+            'p99_ms': float(np.percentile(errors, 99)),
+            'max_ms': float(errors.max()),
+        }
+
+
+if __name__ == '__main__':
+
+    player = PatternPlayer()
+    player.start()
+    player.play(blinks(5, on=0.05, off=0.05))
+    player.play(morse('sos', unit=0.03))
+    # queued while the others play, as led.py's input does
+    time.sleep(0.2)
+    player.play(breathe(period=0.5, cycles=2, steps=25))
+    player.play(fade(100, 0, seconds=0.25, steps=25))
+
+    player.join_queue()
+    player.stop()
+    print(player.stats())
+
+    GPIO.cleanup()
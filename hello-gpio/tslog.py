@@ -0,0 +1,220 @@
+'''Compact binary log of pin readings, and rollups over it.
+
+SeriesLog appends (monotonic time, pin, value) records, 10 bytes each, to
+a preallocated memory-mapped .npy file. Records are gathered in a list and
+copied into the map a batch at a time, so a sensor handler pays for a list
+append, not for I/O. Unwritten slots hold a NaN time, which is how a
+reader finds the end.
+
+Every SeriesLog opened on a file starts a session, marked by a record on
+pin SESSION with value 1, and closing it marks the session's end with
+value 0. The monotonic clock restarts with the machine, so times are only
+comparable within a session, and the time between sessions, when nothing
+was logging, counts for no level.
+
+`rollups` computes duty cycle, rising edges per minute and the longest
+time on for every pin with a few vectorized passes, quick enough for logs
+of millions of records.
+
+Usage:
+    python tslog.py LOG.npy     # print rollups of a log
+    python tslog.py --demo [N]  # write N synthetic records and time it all
+'''
+import os
+import time
+import numpy as np
+
+RECORD = np.dtype([('time', '<f8'), ('pin', 'u1'), ('value', 'u1')])
+
+# not a BCM pin, records on it mark where sessions start and end
+SESSION = 255
+
+
+def open_log(path, capacity):
+    log = np.lib.format.open_memmap(path, mode='w+', dtype=RECORD, shape=(capacity,))
+    log['time'] = np.nan
+    return log
+
+
+def used(log):
+    '''Number of records written to `log`.'''
+    empty = np.isnan(log['time'])
+    return int(np.argmax(empty)) if empty.any() else len(log)
+
+
+class SeriesLog:
+
+    def __init__(self, path, capacity=1 << 20, batch=256, clock=time.monotonic):
+        '''
+        Args:
+            path (str): .npy file to append to, created if missing.
+            capacity (int): Records to preallocate. The file doubles when full.
+            batch (int): Records gathered before they are copied to the file.
+                Loggers of rare events should pass 1, so an edge isn't held
+                in memory for hours and lost with the power.
+            clock (callable): Time of records appended without one, and of
+                the session's end. None to take both from the records.
+        '''
+        self.path = path
+        self.batch = batch
+        self.clock = clock
+        self.pending = []
+        self.last = None
+        if os.path.exists(path):
+            self.log = np.load(path, mmap_mode='r+')
+            self.count = used(self.log)
+        else:
+            self.log = open_log(path, capacity)
+            self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, pin, value, when=None):
+        when = self.clock() if when is None else when
+        if self.last is None:
+            # the session starts with its first record
+            self.pending.append((when, SESSION, 1))
+        self.pending.append((when, pin, value))
+        self.last = when
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        records = np.array(self.pending, dtype=RECORD)
+        self.pending = []
+        while self.count + len(records) > len(self.log):
+            self.grow()
+        self.log[self.count:self.count + len(records)] = records
+        self.count += len(records)
+        self.log.flush()
+
+    def grow(self):
+        '''Move the log to a file twice the size.'''
+        self.log.flush()
+        old = self.log
+        tmp = self.path + '.tmp'
+        self.log = open_log(tmp, 2 * len(old))
+        self.log[:self.count] = old[:self.count]
+        self.log.flush()
+        del old
+        os.replace(tmp, self.path)
+
+    def close(self):
+        if self.last is not None:
+            end = self.last if self.clock is None else max(self.clock(), self.last)
+            self.pending.append((end, SESSION, 0))
+        self.flush()
+        del self.log
+
+
+def load(path):
+    '''The written records of a log file, memory mapped read-only.'''
+    log = np.load(path, mmap_mode='r')
+    return log[:used(log)]
+
+
+def pin_rollup(times, values, sessions, ends):
+    '''Rollup of one pin's records, in time order within each session.
+
+    Args:
+        sessions (ndarray): Session of each record, in ascending order.
+        ends (ndarray): Session -> when it ended.
+    '''
+    high = values > 0
+    first = np.ones(len(times), dtype=bool)
+    first[1:] = sessions[1:] != sessions[:-1]
+    # runs of equal levels, which never carry over into the next session
+    starts = np.flatnonzero(first | np.append(True, high[1:] != high[:-1]))
+    run_sessions = sessions[starts]
+    last = np.append(run_sessions[1:] != run_sessions[:-1], True)
+    # each run lasts until the next, the last of a session until its end
+    stops = np.where(last, ends[run_sessions], np.append(times[starts[1:]], 0))
+    durations = stops - times[starts]
+    on = high[starts]
+
+    span = float((ends[sessions[first]] - times[first]).sum())
+    rises = np.count_nonzero(on & ~first[starts])
+    return {
+        'records': len(times),
+        'sessions': int(np.count_nonzero(first)),
+        'duty_cycle': float(durations[on].sum() / span) if span > 0 else float(high[-1]),
+        'events_per_minute': float(60 * rises / span) if span > 0 else 0.0,
+        'longest_on': float(durations[on].max()) if on.any() else 0.0,
+    }
+
+
+def rollups(records):
+    '''pin -> rollup over every pin in `records`, a log or a path to one.'''
+    if isinstance(records, str):
+        records = load(records)
+    if not len(records):
+        return {}
+
+    # a session starts at its marker, or wherever time goes backwards in a
+    # log without markers, and ends with its latest record
+    times = records['time']
+    boundary = (records['pin'] == SESSION) & (records['value'] == 1)
+    boundary[0] = True
+    boundary[1:] |= times[1:] < times[:-1]
+    sessions = np.cumsum(boundary) - 1
+    ends = np.maximum.reduceat(times, np.flatnonzero(boundary))
+
+    keep = records['pin'] != SESSION
+    records, sessions = records[keep], sessions[keep]
+    if not len(records):
+        return {}
+
+    # a stable sort by pin keeps each pin's records in session and time order
+    order = np.argsort(records['pin'], kind='stable')
+    pins = records['pin'][order]
+    bounds = np.flatnonzero(np.diff(pins)) + 1
+    firsts = np.concatenate([[0], bounds])
+    times = np.split(records['time'][order], bounds)
+    values = np.split(records['value'][order], bounds)
+    sessions = np.split(sessions[order], bounds)
+    return {
+        int(pin): pin_rollup(pin_times, pin_values, pin_sessions, ends)
+        for pin, pin_times, pin_values, pin_sessions in zip(pins[firsts], times, values, sessions)
+    }
+
+
+if __name__ == '__main__':
+
+    import sys
+    import tempfile
+
+    if len(sys.argv) > 1 and sys.argv[1] != '--demo':
+        for pin, rollup in rollups(sys.argv[1]).items():
+            print(pin, rollup)
+        sys.exit()
+
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'demo.npy')
+
+        # an hour of two sensors switching at random
+        times = np.sort(rng.uniform(0, 3600, n))
+        pins = rng.choice(np.array([17, 27], dtype=np.uint8), n)
+        values = rng.integers(0, 2, n, dtype=np.uint8)
+
+        start = time.perf_counter()
+        with SeriesLog(path, capacity=n // 4, clock=None) as log:
+            for when, pin, value in zip(times.tolist(), pins.tolist(), values.tolist()):
+                log.append(pin, value, when)
+        elapsed = time.perf_counter() - start
+        print('appended %d records in %.2f s (%.2f us each), file %.1f MB' % (
+            n, elapsed, 1e6 * elapsed / n, os.path.getsize(path) / 1e6))
+
+        start = time.perf_counter()
+        result = rollups(path)
+        print('rollups in %.3f s' % (time.perf_counter() - start))
+        for pin, rollup in result.items():
+            print(pin, rollup)
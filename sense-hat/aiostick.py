@@ -0,0 +1,203 @@
+'''Joystick events as an asyncio async iterator.
+
+`stick.wait_for_event()` blocks the whole program until the stick is
+pressed. AsyncStick delivers the same events through the event loop, so a
+game can await input, timers and other sources together.
+
+On the real hat the stick's evdev file is watched with `loop.add_reader`,
+so nothing runs until the kernel has an event. Sticks without a file, such
+as sense_emu's or headless', are read by a StickPump thread blocked in
+`wait_for_event`, which costs no CPU while idle either.
+
+Like `wait_for_event(emptybuffer=True)`, opening an AsyncStick discards
+presses made while no AsyncStick was open, e.g. during a win animation,
+unless it is opened with emptybuffer=False.
+
+Usage:
+    python aiostick.py [seconds]
+    python aiostick.py --check  # scripted Maze.run_async games
+'''
+import asyncio
+import threading
+import time
+
+PRESSES = ('pressed', 'held')
+
+
+class StickPump(threading.Thread):
+    '''Thread blocked in `wait_for_event` for a stick with no file to watch.
+
+    There is one per stick. It hands events to whichever AsyncStick is open
+    on the stick and holds them while none is, for the next one to keep or
+    discard.
+    '''
+
+    pumps = {}
+    pumps_lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, stick, target, emptybuffer=True):
+        with cls.pumps_lock:
+            pump = cls.pumps.get(stick)
+            if pump is None or not pump.is_alive():
+                # target set before the thread runs, so whatever it reads
+                # is meant for this target and never counts as held
+                pump = cls.pumps[stick] = cls(stick)
+                pump.set_target(target)
+                pump.start()
+                return pump
+        pump.set_target(target, emptybuffer)
+        return pump
+
+    def __init__(self, stick):
+        super().__init__(daemon=True)
+        self.stick = stick
+        self.target = None
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def set_target(self, target, emptybuffer=False):
+        '''Hand events to `target`, first the held ones. With `emptybuffer`
+        held presses are dropped, but not an exception from the stick.
+        '''
+        with self.lock:
+            self.target = target
+            if target is not None:
+                for item in self.pending:
+                    if not emptybuffer or isinstance(item, Exception):
+                        target.deliver(item)
+                self.pending = []
+
+    def run(self):
+        while True:
+            try:
+                item = self.stick.wait_for_event()
+            except Exception as exc:
+                item = exc
+            with self.lock:
+                if self.target is None:
+                    self.pending.append(item)
+                else:
+                    self.target.deliver(item)
+            if isinstance(item, Exception):
+                return
+
+
+class AsyncStick:
+
+    def __init__(self, stick, emptybuffer=True):
+        '''
+        Args:
+            stick: The hat's stick, e.g. SenseHat().stick.
+            emptybuffer (bool): Discard events from before `open`, as
+                `wait_for_event(emptybuffer=True)` does.
+        '''
+        self.stick = stick
+        self.emptybuffer = emptybuffer
+        self.loop = None
+        self.queue = None
+        self.fd = None
+        self.pump = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        stick_file = getattr(self.stick, '_stick_file', None)
+        if stick_file is not None:
+            if self.emptybuffer:
+                # drain what the kernel buffered while no one was reading
+                self.stick.get_events()
+            self.fd = stick_file.fileno()
+            self.loop.add_reader(self.fd, self.on_readable)
+        else:
+            self.pump = StickPump.attach(self.stick, self, self.emptybuffer)
+
+    def close(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+        if self.pump is not None:
+            self.pump.set_target(None)
+            self.pump = None
+
+    def on_readable(self):
+        for event in self.stick.get_events():
+            self.queue.put_nowait(event)
+
+    def deliver(self, item):
+        '''Queue an event, or an exception to raise, from any thread.'''
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def next_press(self, timeout=None):
+        '''Wait for the next pressed or held event, skipping releases.
+
+        Raises:
+            asyncio.TimeoutError: If nothing was pressed within `timeout` seconds.
+        '''
+        async def press():
+            async for event in self:
+                if event.action in PRESSES:
+                    return event
+        return await asyncio.wait_for(press(), timeout)
+
+
+async def idle_cpu(stick, seconds):
+    '''CPU seconds this process uses while waiting `seconds` for a press that never comes.'''
+    async with AsyncStick(stick) as events:
+        start = time.process_time()
+        try:
+            await events.next_press(timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        return time.process_time() - start
+
+
+def check(games=20, timeout=5.0):
+    '''Scripted Maze.run_async games all finish, none losing its presses.'''
+    import headless
+    from bench import ARR, END, MOVES, START
+    from maze import Layout, Maze
+
+    layout = Layout(arr=ARR, start=START, end=END)
+    for game in range(games):
+        hat = headless.SenseHat()
+        hat.stick.script(MOVES)
+        maze = Maze(layout=layout, hat=hat)
+        try:
+            asyncio.run(asyncio.wait_for(maze.run_async(celebrate=False), timeout))
+        except asyncio.TimeoutError:
+            raise AssertionError('game %d stuck at %r' % (game, (maze.x, maze.y)))
+        assert (maze.x, maze.y) == END, 'game %d ended at %r' % (game, (maze.x, maze.y))
+    return games
+
+
+if __name__ == '__main__':
+
+    import sys
+    import headless
+
+    if sys.argv[1:] == ['--check']:
+        print('ok, %d games' % check())
+        sys.exit()
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    hat = headless.SenseHat()
+    hat.stick.blocking = True
+    cpu = asyncio.run(idle_cpu(hat.stick, seconds))
+    print('waited %.1f s for input using %.4f s of CPU (%.3f%%)' % (seconds, cpu, 100 * cpu / seconds))
@@ -1,6 +1,10 @@
 '''Some 8x8 pixel art.
 '''
+import asyncio
 import numpy as np
+from aiostick import AsyncStick
+from framebuffer import fb_device, pack_rgb565, write_fb
+from scheduler import Scheduler
 
 class Special:
     o = (255,103,0)
@@ -20,9 +24,7 @@ class Special:
 
     @staticmethod
     def random():
-        random_rgb = lambda : (np.random.randint(0, 256), np.random.randint(0, 256), np.random.randint(0, 256))
-        arr = [random_rgb() for _ in range(64)]
-        return arr
+        return [tuple(pixel) for pixel in np.random.randint(0, 256, size=(64, 3)).tolist()]
 
 class Face:
     y = (250,250,55)
@@ -116,45 +118,125 @@ class Animal:
         w, p, p, p, p, p, p, w,
     ]
 
+class Atlas:
+    '''All the art compiled into one contiguous uint8 array.
+
+    Frames are also kept pre-packed as RGB565 so a real hat can be sent a
+    frame as a single write, without `set_pixels` validating and packing
+    64 tuples every time.
+    '''
+
+    # named animations as (frame, seconds) steps, 'random' is a fresh random frame
+    sequences = {
+        'celebrate_win': [('random', 0.25)] * 10 + [
+            ('happy', 1),
+            ('wink_left', 0.3),
+            ('happy', 1),
+        ],
+    }
+
+    def __init__(self, *groups):
+        '''
+        Args:
+            groups: Classes like Face whose 64 pixel list attributes are frames.
+        '''
+        art = [
+            (name, value)
+            for group in groups
+            for name, value in vars(group).items()
+            if isinstance(value, list) and len(value) == 64
+        ]
+        self.names = [name for name, _ in art]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        pixels = [value for _, value in art]
+        self.frames = np.ascontiguousarray(np.array(pixels, dtype=np.uint8).reshape(-1, 8, 8, 3))
+        self.packed = np.ascontiguousarray(pack_rgb565(self.frames).reshape(-1, 64))
+
+    def __getitem__(self, name):
+        return self.frames[self.index[name]]
+
+    @staticmethod
+    def random(n=1):
+        '''`n` random frames of shape (n, 8, 8, 3) from a single draw.'''
+        return np.random.randint(0, 256, size=(n, 8, 8, 3)).astype(np.uint8)
+
+    def show(self, hat, frame):
+        '''Show a frame given by name or as an (8, 8, 3) array.'''
+        if isinstance(frame, str):
+            i = self.index[frame]
+            frame, packed = self.frames[i], self.packed[i]
+        else:
+            packed = None
+
+        # sense_hat writes straight to its framebuffer device, so send packed bytes
+        path = fb_device(hat)
+        if path:
+            if packed is None:
+                packed = pack_rgb565(np.asarray(frame)).reshape(64)
+            write_fb(path, packed)
+        else:
+            hat.set_pixels(np.asarray(frame).reshape(64, 3).tolist())
+
+    def play(self, hat, name, scheduler=None):
+        '''Play a named sequence, holding each frame for its duration.'''
+        steps = self.sequences[name]
+        randoms = iter(self.random(sum(frame == 'random' for frame, _ in steps)))
+        scheduler = scheduler if scheduler is not None else Scheduler(0)
+        scheduler.start()
+        for frame, seconds in steps:
+            self.show(hat, next(randoms) if frame == 'random' else frame)
+            scheduler.wait(seconds)
+
+    async def play_async(self, hat, name, scheduler=None):
+        '''Like `play`, but awaits between frames so other tasks keep running.'''
+        steps = self.sequences[name]
+        randoms = iter(self.random(sum(frame == 'random' for frame, _ in steps)))
+        scheduler = scheduler if scheduler is not None else Scheduler(0)
+        scheduler.start()
+        for frame, seconds in steps:
+            self.show(hat, next(randoms) if frame == 'random' else frame)
+            await scheduler.wait_async(seconds)
+
+
+ATLAS = Atlas(Face, Animal, Special)
+
+
+async def slideshow(hat, images, advance=None):
+    '''Show `images` and step through them with the joystick.
+
+    Args:
+        hat (SenseHat): Hat to show them on.
+        images (list): Atlas names or (8, 8, 3) frames.
+        advance (float): Move to the next image after this many idle
+            seconds, or only on input if None.
+    '''
+    count = 0
+    async with AsyncStick(hat.stick) as events:
+        while True:
+            ATLAS.show(hat, images[count])
+            try:
+                event = await events.next_press(timeout=advance)
+                direction = event.direction
+            except asyncio.TimeoutError:
+                direction = 'right'
+
+            if direction == 'left':
+                count = (count - 1) % len(images)
+            else:
+                count = (count + 1) % len(images)
+
+
 if __name__ == '__main__':
 
     try:
         from sense_hat import SenseHat
     except ImportError:
-        from sense_emu import SenseHat
-    import time
+        try:
+            from sense_emu import SenseHat
+        except ImportError:
+            from headless import SenseHat
 
     hat = SenseHat()
-    epsilon = 0.5
-
-    images = [
-        Face.happy,
-        Face.sad,
-        Face.wink_left,
-        Face.wink_right,
-        Face.blink,
-        Face.shocked,
-        Face.cross,
-        Animal.pig,
-        Special.pumpkin,
-        Special.random(),
-        Special.random(),
-    ]
-
-    count = 0
-    N = len(images)
-    while True:
 
-        image = images[count]
-        hat.set_pixels(image)
-
-        # read joystick input
-        action = None
-        while action not in ['pressed', 'held']:
-            event = hat.stick.wait_for_event(emptybuffer=True)
-            action = event.action
-
-        if event.direction == 'left':
-            count = (count - 1) % N
-        else:
-            count = (count + 1) % N
+    images = ATLAS.names + list(ATLAS.random(2))
+    asyncio.run(slideshow(hat, images))
@@ -0,0 +1,106 @@
+'''Run many seeded, headless rain simulations in parallel and collect statistics.
+
+Used to tune the spawn rates and particle speeds against a CPU and device
+write budget without watching the display.
+
+Usage:
+    python batch.py [runs] [steps]
+'''
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import numpy as np
+import headless
+from rain import Rain, Drop, Cloud, Lightning
+
+# statistics recorded every tick
+STATS = ('particles', 'occupancy', 'changed', 'pixel_writes')
+
+SPEEDS = {
+    'drop_speed': Drop,
+    'cloud_speed': Cloud,
+    'lightning_speed': Lightning,
+}
+
+
+def simulate(seed, steps, engine='object', width=8, height=8, **params):
+    '''Run one headless simulation.
+
+    Args:
+        seed (int): Seed for NumPy's global random state.
+        steps (int): Number of ticks.
+        engine (str): Rain engine, 'object' or 'vector'.
+        width (int): World width in pixels.
+        height (int): World height in pixels.
+        params: Overrides for Rain's `drop_rate`, `cloud_rate` and
+            `lightning_rate`, and (min, max) tuples for `drop_speed`,
+            `cloud_speed` and `lightning_speed`.
+
+    Returns:
+        dict: Per-tick arrays of shape (steps,) for each name in STATS.
+    '''
+    saved = {cls: (cls.min_speed, cls.max_speed) for cls in SPEEDS.values()}
+    try:
+        for name, cls in SPEEDS.items():
+            if name in params:
+                cls.min_speed, cls.max_speed = params.pop(name)
+
+        np.random.seed(seed)
+        hats = [[headless.SenseHat(capacity=1) for _ in range(width // 8)] for _ in range(height // 8)]
+        hat = hats[0][0] if (width, height) == (8, 8) else hats
+        rain = Rain(engine=engine, hat=hat, width=width, height=height)
+        for name, value in params.items():
+            if not name.endswith('_rate'):
+                raise TypeError('unknown parameter %r' % name)
+            setattr(rain, name, value)
+
+        stats = {name: np.zeros(steps) for name in STATS}
+        for i in range(steps):
+            rain.spawn()
+            rain.step()
+            report = rain.show()
+            stats['particles'][i] = len(rain.drops) + len(rain.clouds) + len(rain.lightnings)
+            stats['occupancy'][i] = np.any(rain.arr != 0, axis=-1).mean()
+            stats['changed'][i] = report['pixel_writes'] > 0
+            stats['pixel_writes'][i] = report['pixel_writes']
+        return stats
+    finally:
+        # speeds are class attributes, so put them back for the next task
+        for cls, (min_speed, max_speed) in saved.items():
+            cls.min_speed, cls.max_speed = min_speed, max_speed
+
+
+def run_batch(runs, steps, seed=0, processes=None, **params):
+    '''Run `runs` simulations with seeds seed, seed + 1, ... across a process pool.
+
+    Args:
+        runs (int): Number of simulations.
+        steps (int): Ticks per simulation.
+        seed (int): Seed of the first run.
+        processes (int): Pool size, defaults to the number of CPUs.
+        params: Passed on to `simulate`.
+
+    Returns:
+        dict: Arrays of shape (runs, steps) for each name in STATS.
+    '''
+    seeds = range(seed, seed + runs)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(simulate, s, steps, **params) for s in seeds]
+        results = [future.result() for future in futures]
+    return {name: np.stack([r[name] for r in results]) for name in STATS}
+
+
+def summarize(stats):
+    '''Mean of each statistic per run and over all runs.'''
+    return {name: (arr.mean(axis=1), arr.mean()) for name, arr in stats.items()}
+
+
+if __name__ == '__main__':
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print('%-10s %10s %10s %10s %12s' % (('drop_rate',) + STATS))
+    for drop_rate in (0.06, 0.12, 0.24, 0.48):
+        stats = run_batch(runs, steps, drop_rate=drop_rate)
+        means = [mean for _, mean in summarize(stats).values()]
+        print('%-10.2f %10.2f %10.3f %10.3f %12.2f' % tuple([drop_rate] + means))
@@ -0,0 +1,86 @@
+'''Benchmark Rain, Maze and Roll against the headless sense hat.
+
+Usage:
+    python bench.py [frames]
+'''
+import sys
+import time
+import numpy as np
+import headless
+from rain import Rain
+from maze import Maze, Layout
+from roll import Roll
+
+# first level from maze.py and roll.py, with its solution
+ARR = np.array([
+    [1, 1, 1, 1, 1, 1, 1, 1,],
+    [0, 0, 0, 0, 0, 0, 0, 0,],
+    [1, 1, 1, 1, 1, 1, 1, 0,],
+    [0, 0, 0, 0, 0, 0, 0, 0,],
+    [0, 1, 1, 1, 1, 1, 1, 1,],
+    [0, 1, 0, 0, 0, 1, 0, 0,],
+    [0, 1, 0, 1, 0, 1, 0, 1,],
+    [0, 0, 0, 1, 0, 0, 0, 1,],
+]).T
+START = (0, 1)
+END = (7, 5)
+MOVES = (
+    ['right'] * 7 + ['down'] * 2 + ['left'] * 7 + ['down'] * 4
+    + ['right'] * 2 + ['up'] * 2 + ['right'] * 2 + ['down'] * 2
+    + ['right'] * 2 + ['up'] * 2 + ['right']
+)
+
+# tilt that makes Roll take the same step as a joystick press
+TILT = {
+    'up': (0.0, -0.5, 0.0),
+    'down': (0.0, 0.5, 0.0),
+    'left': (0.5, 0.0, 0.0),
+    'right': (-0.5, 0.0, 0.0),
+}
+
+
+def report(name, frames, elapsed):
+    print('%-6s %8d frames %8.3f s %10.0f fps' % (name, frames, elapsed, frames / elapsed))
+
+
+def bench_rain(frames, engine):
+    hat = headless.SenseHat()
+    rain = Rain(engine=engine, hat=hat)
+    start = time.perf_counter()
+    rain.run(steps=frames, tick_duration=0)
+    return time.perf_counter() - start
+
+
+def bench_maze(rounds):
+    layout = Layout(arr=ARR, start=START, end=END)
+    elapsed = 0
+    for _ in range(rounds):
+        hat = headless.SenseHat()
+        hat.stick.script(MOVES)
+        start = time.perf_counter()
+        Maze(layout=layout, hat=hat).run(celebrate=False)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def bench_roll(rounds):
+    layout = Layout(arr=ARR, start=START, end=END)
+    elapsed = 0
+    for _ in range(rounds):
+        hat = headless.SenseHat()
+        hat.script_orientation([TILT[move] for move in MOVES])
+        start = time.perf_counter()
+        Roll(layout=layout, hat=hat).run(fast_tick=0, slow_tick=0, celebrate=False)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+if __name__ == '__main__':
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = max(1, frames // len(MOVES))
+
+    report('rain', frames, bench_rain(frames, engine='object'))
+    report('rain-v', frames, bench_rain(frames, engine='vector'))
+    report('maze', rounds * len(MOVES), bench_maze(rounds))
+    report('roll', rounds * len(MOVES), bench_roll(rounds))
@@ -1,7 +1,10 @@
 try:
     from sense_hat import SenseHat
 except ImportError:
-    from sense_emu import SenseHat
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
 
 if __name__ == '__main__':
 
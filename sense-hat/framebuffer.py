@@ -0,0 +1,269 @@
+'''Dirty-pixel framebuffer that only sends the sense hat what changed.
+'''
+import numpy as np
+
+# the hat's framebuffer stores each pixel as 2 bytes of RGB565
+BYTES_PER_PIXEL = 2
+
+
+def pack_rgb565(frames):
+    '''Pack (..., 3) uint8 colors into the hat's 16 bit RGB565 pixels.'''
+    frames = np.asarray(frames).astype(np.uint16)
+    r = (frames[..., 0] >> 3) & 0x1F
+    g = (frames[..., 1] >> 2) & 0x3F
+    b = (frames[..., 2] >> 3) & 0x1F
+    return (r << 11) | (g << 5) | b
+
+
+def fb_device(hat):
+    '''Path of `hat`'s framebuffer device, if pixels can go straight to it.
+
+    sense_hat opens the device on every set_pixel(s) call. Writing packed
+    pixels to it ourselves is only right when the hat isn't rotated.
+    '''
+    path = getattr(hat, '_fb_device', None)
+    if path and getattr(hat, 'rotation', 0) == 0:
+        return path
+    return None
+
+
+def write_fb(path, packed, offsets=None):
+    '''Write RGB565 pixels to the framebuffer device at `path` in one open.
+
+    Args:
+        packed (np.ndarray): Packed pixels, a whole frame in row order, or
+            the pixels at `offsets`.
+        offsets (np.ndarray): Flat pixel index of each of `packed`.
+    '''
+    packed = np.asarray(packed).astype(np.uint16)
+    with open(path, 'wb') as f:
+        if offsets is None:
+            f.write(packed.tobytes())
+            return
+        for offset, pixel in zip((offsets * BYTES_PER_PIXEL).tolist(), packed):
+            f.seek(offset)
+            f.write(pixel.tobytes())
+
+
+class FrameBuffer:
+
+    def __init__(self, hat, threshold=8, dim=8):
+        '''
+        Args:
+            hat (SenseHat): Device (or emulator) to write to.
+            threshold (int): When more pixels than this changed, send the
+                whole frame with one `set_pixels` call instead of one
+                `set_pixel` call per changed pixel.
+            dim (int): Side length of the display.
+        '''
+        self.hat = hat
+        self.threshold = threshold
+        self.dim = dim
+        self.last = None
+        self.last_report = None
+
+        # running totals over all pushed frames
+        self.frames = 0
+        self.pixel_writes = 0
+        self.writes_saved = 0
+        self.bytes_saved = 0
+
+    def clear(self):
+        '''Clear the hat and remember that every pixel is now off.'''
+        self.hat.clear()
+        self.last = np.zeros((self.dim, self.dim, 3), dtype=int)
+
+    def invalidate(self):
+        '''Forget the last frame, e.g. after `hat.clear()`, so the next push is a full write.'''
+        self.last = None
+
+    def push(self, arr, touched=None):
+        '''Show a frame, writing only the pixels that differ from the last one.
+
+        Args:
+            arr (np.ndarray): Frame of shape (rows, cols, 3), or a flat list
+                of dim * dim colors as passed to `set_pixels`.
+            touched (np.ndarray): Flat indices of the pixels written since
+                the last push, if known. When empty the comparison is skipped.
+
+        Returns:
+            dict: Report for this frame with the write `mode` ('skip',
+                'partial' or 'full'), the number of `changed` pixels and the
+                `pixel_writes`, `writes_saved` and `bytes_saved` compared to
+                a full write.
+        '''
+        arr = np.asarray(arr)
+        if arr.ndim == 2:
+            arr = arr.reshape(self.dim, self.dim, -1)
+        n_pixels = arr.shape[0] * arr.shape[1]
+
+        if touched is not None and len(touched) == 0 and self.last is not None:
+            return self.record('skip', 0, 0, n_pixels)
+
+        if self.last is None or self.last.shape != arr.shape:
+            changed = np.ones(arr.shape[:2], dtype=bool)
+        else:
+            changed = np.any(arr != self.last, axis=-1)
+        n_changed = int(changed.sum())
+
+        if n_changed == 0:
+            mode = 'skip'
+            pixel_writes = 0
+        elif n_changed > self.threshold:
+            mode = 'full'
+            pixel_writes = n_pixels
+            self.hat.set_pixels(arr.reshape(n_pixels, -1).tolist())
+        else:
+            mode = 'partial'
+            pixel_writes = n_changed
+            self.write_pixels(arr, changed)
+
+        self.last = arr.copy()
+        return self.record(mode, n_changed, pixel_writes, n_pixels)
+
+    def write_pixels(self, arr, changed):
+        '''Write the pixels of `arr` where `changed` is set.'''
+        rows, cols = np.nonzero(changed)
+
+        # sense_hat opens its framebuffer device on every set_pixel, so on
+        # the real hat write all the changes through one open instead
+        path = fb_device(self.hat)
+        if path:
+            write_fb(path, pack_rgb565(arr[rows, cols]), rows * arr.shape[1] + cols)
+            return
+
+        for row, col in zip(rows, cols):
+            self.hat.set_pixel(int(col), int(row), arr[row, col].tolist())
+
+    def set_pixel(self, x, y, color):
+        '''Set a single pixel, skipping the write if it already has that color.'''
+        color = tuple(color)
+        if self.last is not None and tuple(self.last[y, x].tolist()) == color:
+            return self.record('skip', 0, 0, 1)
+        self.hat.set_pixel(x, y, color)
+        if self.last is not None:
+            self.last[y, x] = color
+        return self.record('partial', 1, 1, 1)
+
+    def record(self, mode, changed, pixel_writes, n_pixels):
+        saved = n_pixels - pixel_writes
+        self.frames += 1
+        self.pixel_writes += pixel_writes
+        self.writes_saved += saved
+        self.bytes_saved += saved * BYTES_PER_PIXEL
+        self.last_report = {
+            'mode': mode,
+            'changed': changed,
+            'pixel_writes': pixel_writes,
+            'writes_saved': saved,
+            'bytes_saved': saved * BYTES_PER_PIXEL,
+        }
+        return self.last_report
+
+    def stats(self):
+        '''Totals over all frames pushed so far.'''
+        return {
+            'frames': self.frames,
+            'pixel_writes': self.pixel_writes,
+            'writes_saved': self.writes_saved,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+class PanelWall:
+    '''Tiles of `dim` x `dim` displays showing one shared (height, width, 3) array.
+
+    Each panel has its own FrameBuffer, and when the caller knows which
+    pixels were written only the panels containing them are compared.
+    '''
+
+    def __init__(self, hats, threshold=8, dim=8):
+        '''
+        Args:
+            hats (list): Grid (list of rows) of displays, one per panel.
+            threshold (int): Passed on to each panel's FrameBuffer.
+            dim (int): Side length of a panel.
+        '''
+        self.dim = dim
+        self.rows = len(hats)
+        self.cols = len(hats[0])
+        self.screens = [FrameBuffer(hat, threshold=threshold, dim=dim) for row in hats for hat in row]
+        self.last_report = None
+
+        # running totals over all pushed frames, for the whole wall
+        self.frames = 0
+        self.pixel_writes = 0
+        self.writes_saved = 0
+        self.bytes_saved = 0
+
+    def panel(self, arr, i):
+        row, col = divmod(i, self.cols)
+        return arr[row * self.dim:(row + 1) * self.dim, col * self.dim:(col + 1) * self.dim]
+
+    def clear(self):
+        for screen in self.screens:
+            screen.clear()
+
+    def invalidate(self):
+        for screen in self.screens:
+            screen.invalidate()
+
+    def push(self, arr, touched=None):
+        '''Blit the panels of `arr` that may have changed.
+
+        Args:
+            arr (np.ndarray): Frame of shape (rows * dim, cols * dim, 3).
+            touched (np.ndarray): Flat indices into `arr` written since the
+                last push, if known. Only panels containing one of them, or
+                never drawn yet, are compared.
+
+        Returns:
+            dict: Report with the number of `panels` compared and the
+                `pixel_writes`, `writes_saved` and `bytes_saved` for the wall.
+        '''
+        if touched is None:
+            dirty = range(len(self.screens))
+        else:
+            row, col = np.divmod(touched, arr.shape[1])
+            dirty = set((row // self.dim * self.cols + col // self.dim).tolist())
+            dirty.update(i for i, screen in enumerate(self.screens) if screen.last is None)
+
+        pixel_writes = 0
+        for i in dirty:
+            pixel_writes += self.screens[i].push(self.panel(arr, i))['pixel_writes']
+
+        saved = arr.shape[0] * arr.shape[1] - pixel_writes
+        self.frames += 1
+        self.pixel_writes += pixel_writes
+        self.writes_saved += saved
+        self.bytes_saved += saved * BYTES_PER_PIXEL
+        self.last_report = {
+            'panels': len(dirty),
+            'pixel_writes': pixel_writes,
+            'writes_saved': saved,
+            'bytes_saved': saved * BYTES_PER_PIXEL,
+        }
+        return self.last_report
+
+    def stats(self):
+        '''Totals over all frames pushed so far.'''
+        return {
+            'frames': self.frames,
+            'pixel_writes': self.pixel_writes,
+            'writes_saved': self.writes_saved,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+def open_screen(hat, width=8, height=8, dim=8, threshold=8):
+    '''A FrameBuffer for a single panel, or a PanelWall for a grid of them.
+
+    Args:
+        hat: One display when the world is a single panel, else a grid
+            (list of rows) of height // dim rows and width // dim displays.
+    '''
+    if (width, height) == (dim, dim):
+        return FrameBuffer(hat, threshold=threshold, dim=dim)
+    if len(hat) != height // dim or any(len(row) != width // dim for row in hat):
+        raise ValueError('need a grid of %d x %d displays' % (height // dim, width // dim))
+    return PanelWall(hat, threshold=threshold, dim=dim)
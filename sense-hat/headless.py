@@ -0,0 +1,161 @@
+'''In-memory stand-in for the sense hat, for benchmarks and CI without a display.
+
+Supports the parts of the SenseHat API these scripts use. Frames are kept in
+a NumPy ring buffer, and joystick and IMU input comes from a script instead
+of hardware.
+'''
+from collections import deque, namedtuple
+import math
+import threading
+import time
+import numpy as np
+
+InputEvent = namedtuple('InputEvent', ('timestamp', 'direction', 'action'))
+
+ACTION_PRESSED = 'pressed'
+ACTION_RELEASED = 'released'
+ACTION_HELD = 'held'
+
+
+class ScriptExhausted(Exception):
+    '''Raised when a game waits for input that was never scripted.'''
+
+
+class SenseStick:
+
+    def __init__(self, blocking=False):
+        '''
+        Args:
+            blocking (bool): When the script is empty, wait for another thread
+                to push an event, like the real stick, instead of raising
+                ScriptExhausted.
+        '''
+        self.events = deque()
+        self.blocking = blocking
+        self.pushed = threading.Condition()
+
+    def push(self, direction, action=ACTION_PRESSED):
+        with self.pushed:
+            self.events.append(InputEvent(time.time(), direction, action))
+            self.pushed.notify_all()
+
+    def script(self, directions, action=ACTION_PRESSED):
+        '''Queue one event per direction, e.g. ['up', 'up', 'left'].'''
+        for direction in directions:
+            self.push(direction, action)
+
+    def wait_for_event(self, emptybuffer=False):
+        '''Return the next scripted event.
+
+        `emptybuffer` is accepted for compatibility but ignored, since the
+        queue holds input that is meant to be consumed in order.
+        '''
+        with self.pushed:
+            if self.blocking:
+                self.pushed.wait_for(lambda: self.events)
+            if not self.events:
+                raise ScriptExhausted('no joystick events left')
+            return self.events.popleft()
+
+    def get_events(self):
+        with self.pushed:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+
+class SenseHat:
+
+    def __init__(self, capacity=1024, dim=8):
+        '''
+        Args:
+            capacity (int): Number of frames kept in the ring buffer.
+            dim (int): Side length of the display.
+        '''
+        self.dim = dim
+        self.pixels = np.zeros((dim, dim, 3), dtype=np.uint8)
+        self.frames = np.zeros((capacity, dim, dim, 3), dtype=np.uint8)
+        self.frame_count = 0
+        self.low_light = False
+
+        self.stick = SenseStick()
+        self.imu_config = (True, True, True)
+        self.orientations = deque()
+        self.orientation = {'pitch': 0.0, 'roll': 0.0, 'yaw': 0.0}
+
+    # display
+
+    def record(self):
+        self.frames[self.frame_count % len(self.frames)] = self.pixels
+        self.frame_count += 1
+
+    def history(self):
+        '''Recorded frames, oldest first, as an array of shape (n, dim, dim, 3).'''
+        capacity = len(self.frames)
+        if self.frame_count <= capacity:
+            return self.frames[:self.frame_count].copy()
+        start = self.frame_count % capacity
+        return np.concatenate([self.frames[start:], self.frames[:start]])
+
+    def set_pixels(self, pixel_list):
+        arr = np.asarray(pixel_list)
+        if arr.shape != (self.dim * self.dim, 3):
+            raise ValueError('Pixel lists must have %d elements' % (self.dim * self.dim))
+        if arr.min() < 0 or arr.max() > 255:
+            raise ValueError('Pixel elements must be between 0 and 255')
+        self.pixels[:] = arr.reshape(self.dim, self.dim, 3)
+        self.record()
+
+    def get_pixels(self):
+        return self.pixels.reshape(-1, 3).tolist()
+
+    def set_pixel(self, x, y, *args):
+        pixel = args[0] if len(args) == 1 else args
+        if not (0 <= x < self.dim and 0 <= y < self.dim):
+            raise ValueError('X and Y position must be between 0 and %d' % (self.dim - 1))
+        if len(pixel) != 3 or min(pixel) < 0 or max(pixel) > 255:
+            raise ValueError('Pixel elements must be between 0 and 255')
+        self.pixels[y, x] = pixel
+        self.record()
+
+    def get_pixel(self, x, y):
+        return self.pixels[y, x].tolist()
+
+    def clear(self, *args):
+        color = (0, 0, 0)
+        if len(args) == 1:
+            color = args[0]
+        elif len(args) == 3:
+            color = args
+        self.pixels[:] = color
+        self.record()
+
+    # imu
+
+    def set_imu_config(self, compass_enabled, gyro_enabled, accel_enabled):
+        self.imu_config = (compass_enabled, gyro_enabled, accel_enabled)
+
+    def script_orientation(self, samples):
+        '''Queue IMU readings returned by successive orientation calls.
+
+        Args:
+            samples: Dicts with 'pitch', 'roll' and 'yaw' in radians, or an
+                array of shape (n, 3) in that order. Once they run out the
+                last reading is held.
+        '''
+        for sample in samples:
+            if not isinstance(sample, dict):
+                sample = dict(zip(('pitch', 'roll', 'yaw'), map(float, sample)))
+            self.orientations.append(sample)
+
+    def get_orientation_radians(self):
+        if self.orientations:
+            self.orientation = self.orientations.popleft()
+        return dict(self.orientation)
+
+    def get_orientation_degrees(self):
+        o = self.get_orientation_radians()
+        return {k: math.degrees(v) % 360 for k, v in o.items()}
+
+    def get_orientation(self):
+        return self.get_orientation_degrees()
@@ -1,6 +1,9 @@
 try:
     from sense_hat import SenseHat
 except ImportError:
-    from sense_emu import SenseHat
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
 
 hat = SenseHat()
\ No newline at end of file
@@ -0,0 +1,121 @@
+'''Background IMU sampling, decoupled from the game loop.
+
+A thread polls `get_orientation_radians()` at a fixed rate, low-pass filters
+the readings and keeps them in a ring buffer. The game reads the latest
+filtered orientation without blocking or waiting on the sensor.
+'''
+import math
+import threading
+import time
+import numpy as np
+from scheduler import Scheduler
+
+AXES = ('pitch', 'roll', 'yaw')
+
+
+def wrap(angle):
+    '''Wrap an angle in radians into [-pi, pi).'''
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class ImuSampler(threading.Thread):
+
+    def __init__(self, hat, rate=100, alpha=0.3, size=256):
+        '''
+        Args:
+            hat (SenseHat): Hat to read the IMU from. Only this thread should
+                read it while the sampler runs.
+            rate (float): Samples per second.
+            alpha (float): Low-pass weight of each new reading, 1 disables
+                filtering.
+            size (int): Number of filtered samples kept in the ring buffer.
+        '''
+        super().__init__(daemon=True)
+        self.hat = hat
+        self.rate = rate
+        self.alpha = alpha
+        self.scheduler = Scheduler(1 / rate, policy='drop')
+        self.stopped = threading.Event()
+        self.ready = threading.Event()
+        # what stopped the thread early, raised again to readers
+        self.error = None
+
+        # rows of (monotonic time, pitch, roll, yaw), written only by this thread
+        self.samples = np.zeros((size, 1 + len(AXES)))
+        self.count = 0
+
+        # latest filtered reading, swapped in whole so readers never see half an update
+        self.current = None
+
+    def run(self):
+        try:
+            self.sample()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            # wake wait_ready, which reports the error if there was one
+            self.ready.set()
+
+    def sample(self):
+        self.scheduler.start()
+        while not self.stopped.is_set():
+            o = self.hat.get_orientation_radians()
+            now = time.monotonic()
+            if self.current is None:
+                filtered = [o[axis] for axis in AXES]
+            else:
+                filtered = [
+                    wrap(self.current[axis] + self.alpha * wrap(o[axis] - self.current[axis]))
+                    for axis in AXES
+                ]
+
+            self.samples[self.count % len(self.samples)] = [now] + filtered
+            self.count += 1
+            self.current = dict(zip(AXES, filtered), time=now)
+            self.ready.set()
+            self.scheduler.wait()
+
+    def wait_ready(self, timeout=1.0):
+        '''Block until the first reading.
+
+        Raises:
+            TimeoutError: If there was none within `timeout` seconds.
+            Exception: Whatever stopped the sampler's thread.
+        '''
+        if not self.ready.wait(timeout):
+            raise TimeoutError('no IMU reading within %g s' % timeout)
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def latest(self):
+        '''Latest filtered orientation as a dict like `get_orientation_radians()`, or None.
+
+        Raises:
+            Exception: Whatever stopped the sampler's thread, rather than
+                returning its last reading forever.
+        '''
+        if self.error is not None:
+            raise self.error
+        return self.current
+
+    def history(self):
+        '''Buffered samples, oldest first, as rows of (time, pitch, roll, yaw).'''
+        size = len(self.samples)
+        if self.count <= size:
+            return self.samples[:self.count].copy()
+        start = self.count % size
+        return np.concatenate([self.samples[start:], self.samples[:start]])
+
+    def stats(self):
+        '''Achieved sample rate and how old the latest reading is, in seconds.'''
+        current = self.current
+        return {
+            'samples': self.count,
+            'rate': self.scheduler.fps,
+            'jitter': self.scheduler.jitter,
+            'staleness': time.monotonic() - current['time'] if current else None,
+        }
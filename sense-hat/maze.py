@@ -1,10 +1,15 @@
 try:
     from sense_hat import SenseHat
 except ImportError:
-    from sense_emu import SenseHat
-import time
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
 import numpy as np
-from art import Special, Face
+from framebuffer import FrameBuffer
+from aiostick import AsyncStick
+from art import ATLAS
+from solver import Solver
 
 class Point:
     def __init__(self, x, y):
@@ -25,12 +30,12 @@ class Layout:
 
 class Maze:
 
-    def __init__(self, layout: Layout, dim: int=8):
+    def __init__(self, layout: Layout, dim: int=8, hat=None):
         self.dim = dim
 
         # prep hat
-        self.hat = SenseHat()
-        self.hat.clear()
+        self.hat = hat if hat is not None else SenseHat()
+        self.screen = FrameBuffer(self.hat, dim=dim)
 
         # set maze colors
         self.ball_color = (255, 0, 0)
@@ -40,41 +45,41 @@ class Maze:
 
         # set the layout of the maze
         self.layout = layout
-        self.set_layout()
+        self.solver = Solver(layout)
 
         # create ball
         self.x = self.layout.start.x
         self.y = self.layout.start.y
-        self.hat.set_pixel(self.x, self.y, self.ball_color)
 
         # create target
         self.target_x = self.layout.end.x
         self.target_y = self.layout.end.y
-        self.hat.set_pixel(self.target_x, self.target_y, self.target_color)
+
+        self.set_layout()
 
         # is ball == target?
         self.done = False
 
     def set_layout(self):
-        for i in range(self.dim):
-            for j in range(self.dim):
-                if self.layout.arr[i][j] == 1:
-                    self.hat.set_pixel(i, j, self.wall_color)
+        # compose the whole level, indexed [y][x] like the hat, and send it in one write
+        self.frame = np.zeros((self.dim, self.dim, 3), dtype=int)
+        self.frame[:] = self.background_color
+        self.frame[np.asarray(self.layout.arr).T == 1] = self.wall_color
+        self.frame[self.y, self.x] = self.ball_color
+        self.frame[self.target_y, self.target_x] = self.target_color
+        self.screen.push(self.frame)
+
+    def hint(self):
+        '''Direction that gets the ball one step closer to the target.'''
+        return self.solver.next_move(self.x, self.y)
 
     def celebrate_win(self):
-        for _ in range(10):
-            self.hat.set_pixels(Special.random())
-            time.sleep(0.25)
-        self.hat.set_pixels(Face.happy)
-        time.sleep(1)
-        self.hat.set_pixels(Face.wink_left)
-        time.sleep(0.3)
-        self.hat.set_pixels(Face.happy)
-        time.sleep(1)
+        ATLAS.play(self.hat, 'celebrate_win')
+        self.screen.invalidate()
 
     def move_ball(self, direction):
 
-        self.hat.set_pixel(self.x, self.y, self.background_color)
+        x, y = self.x, self.y
 
         if direction == 'up':
             if self.y - 1 >= 0:
@@ -93,9 +98,13 @@ class Maze:
                 if self.layout.arr[self.x + 1][self.y] == 0:
                     self.x += 1
 
-        self.hat.set_pixel(self.x, self.y, self.ball_color)
+        # blocked moves leave the display untouched
+        if (x, y) != (self.x, self.y):
+            self.frame[y, x] = self.background_color
+            self.frame[self.y, self.x] = self.ball_color
+            self.screen.push(self.frame)
 
-    def run(self):
+    def run(self, celebrate=True):
         
         while self.done is False:
 
@@ -110,7 +119,22 @@ class Maze:
             if self.x == self.target_x and self.y == self.target_y:
                 self.done = True
         
-        self.celebrate_win()
+        if celebrate:
+            self.celebrate_win()
+
+    async def run_async(self, celebrate=True):
+        '''Like `run`, but awaits joystick input so other tasks keep running.'''
+        async with AsyncStick(self.hat.stick) as events:
+            while self.done is False:
+                event = await events.next_press()
+                self.move_ball(event.direction)
+
+                if self.x == self.target_x and self.y == self.target_y:
+                    self.done = True
+
+        if celebrate:
+            await ATLAS.play_async(self.hat, 'celebrate_win')
+            self.screen.invalidate()
 
 
 if __name__ == '__main__':
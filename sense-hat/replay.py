@@ -0,0 +1,84 @@
+'''Pre-render rain frames offline and stream them to the sense hat later.
+
+Usage:
+    python replay.py render rain.npy --steps 1000000 --seed 0
+    python replay.py play rain.npy --fps 20 --loop
+'''
+try:
+    from sense_hat import SenseHat
+except ImportError:
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
+import argparse
+import numpy as np
+import headless
+from framebuffer import open_screen
+from rain import Rain
+from scheduler import Scheduler
+
+
+def render(path, steps, engine='object', seed=None, width=8, height=8):
+    '''Simulate `steps` ticks of rain headlessly and save the frames to `path`.'''
+    if seed is not None:
+        np.random.seed(seed)
+    hats = [[headless.SenseHat(capacity=1) for _ in range(width // 8)] for _ in range(height // 8)]
+    hat = hats[0][0] if (width, height) == (8, 8) else hats
+    rain = Rain(engine=engine, hat=hat, width=width, height=height)
+    return rain.export(path, steps)
+
+
+def play(path, fps=20, loop=False, hat=None):
+    '''Stream frames saved by `render` to the hat at `fps` frames per second.
+
+    The file is memory-mapped, so only the frames being shown are read, and
+    frames identical to the previous one cost no device write. Frames
+    bigger than one panel need `hat` to be a grid (list of rows) of displays.
+
+    Raises:
+        ValueError: If the frames are bigger than one panel and no `hat` grid is given.
+    '''
+    frames = np.load(path, mmap_mode='r')
+    height, width = frames.shape[1:3]
+    if hat is None and (width, height) != (8, 8):
+        raise ValueError('%s has %dx%d frames, only 8x8 frames play on a single sense hat' % (path, width, height))
+    screen = open_screen(hat if hat is not None else SenseHat(), width=width, height=height)
+    scheduler = Scheduler(1 / fps, policy='drop')
+    while True:
+        for i in scheduler.run(len(frames)):
+            screen.push(frames[i])
+        if not loop:
+            return screen
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    render_parser = commands.add_parser('render')
+    render_parser.add_argument('path')
+    render_parser.add_argument('--steps', type=int, default=10000)
+    render_parser.add_argument('--engine', default='object', choices=Rain.engines)
+    render_parser.add_argument('--seed', type=int)
+    render_parser.add_argument('--width', type=int, default=8)
+    render_parser.add_argument('--height', type=int, default=8)
+
+    play_parser = commands.add_parser('play')
+    play_parser.add_argument('path')
+    play_parser.add_argument('--fps', type=float, default=20)
+    play_parser.add_argument('--loop', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'render':
+        render(
+            args.path, args.steps, engine=args.engine, seed=args.seed,
+            width=args.width, height=args.height,
+        )
+    else:
+        try:
+            screen = play(args.path, fps=args.fps, loop=args.loop)
+        except ValueError as exc:
+            parser.error(str(exc))
+        screen.clear()
@@ -1,10 +1,16 @@
 try:
     from sense_hat import SenseHat
 except ImportError:
-    from sense_emu import SenseHat
-import time
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
 import numpy as np
-from art import Special, Face
+from art import ATLAS
+from solver import Solver
+from imu import ImuSampler
+from framebuffer import FrameBuffer
+from scheduler import Scheduler
 
 class Point:
     def __init__(self, x, y):
@@ -24,12 +30,12 @@ class Layout:
 
 class Roll:
 
-    def __init__(self, layout: Layout, dim=8):
+    def __init__(self, layout: Layout, dim=8, hat=None):
         self.dim = dim
 
         # prep hat
-        self.hat = SenseHat()
-        self.hat.clear()
+        self.hat = hat if hat is not None else SenseHat()
+        self.screen = FrameBuffer(self.hat, dim=dim)
         self.hat.set_imu_config(False, True, False)
 
         # set maze colors
@@ -40,41 +46,40 @@ class Roll:
 
         # set the layout of the maze
         self.layout = layout
+        self.solver = Solver(layout)
         self.set_layout()
 
     def set_layout(self):
-        for i in range(self.dim):
-            for j in range(self.dim):
-                if self.layout.arr[i][j] == 1:
-                    self.hat.set_pixel(i, j, self.wall_color)
-
         # create ball
         self.x = self.layout.start.x
         self.y = self.layout.start.y
-        self.hat.set_pixel(self.x, self.y, self.ball_color)
 
         # create target
         self.target_x = self.layout.end.x
         self.target_y = self.layout.end.y
-        self.hat.set_pixel(self.target_x, self.target_y, self.target_color)
+
+        # compose the whole level, indexed [y][x] like the hat, and send it in one write
+        self.frame = np.zeros((self.dim, self.dim, 3), dtype=int)
+        self.frame[:] = self.background_color
+        self.frame[np.asarray(self.layout.arr).T == 1] = self.wall_color
+        self.frame[self.y, self.x] = self.ball_color
+        self.frame[self.target_y, self.target_x] = self.target_color
+        self.screen.push(self.frame)
 
         # is ball == target?
         self.done = False
 
+    def hint(self):
+        '''Direction that gets the ball one step closer to the target.'''
+        return self.solver.next_move(self.x, self.y)
+
     def celebrate_win(self):
-        for _ in range(10):
-            self.hat.set_pixels(Special.random())
-            time.sleep(0.25)
-        self.hat.set_pixels(Face.happy)
-        time.sleep(1)
-        self.hat.set_pixels(Face.wink_left)
-        time.sleep(0.3)
-        self.hat.set_pixels(Face.happy)
-        time.sleep(1)
+        ATLAS.play(self.hat, 'celebrate_win')
+        self.screen.invalidate()
 
     def move_ball(self, roll, pitch):
 
-        self.hat.set_pixel(self.x, self.y, self.background_color)
+        x, y = self.x, self.y
 
         if roll < 0:
             if self.y - 1 >= 0:
@@ -93,28 +98,59 @@ class Roll:
                 if self.layout.arr[self.x + 1][self.y] == 0:
                     self.x += 1
 
-        self.hat.set_pixel(self.x, self.y, self.ball_color)
-
-    def run(self):
-
-        while self.done is False:    
-            o = self.hat.get_orientation_radians()            
-            roll = o['roll']
-            pitch = o['pitch']
-
-            if abs(roll) > 0.3 or abs(pitch) > 0.3:
-                epsilon = 0.1
-            else:
-                epsilon = 0.3
-
-            self.move_ball(roll=roll, pitch=pitch)
-
-            if self.x == self.target_x and self.y == self.target_y:
-                self.done = True
-            
-            time.sleep(epsilon)
-        
-        self.celebrate_win()
+        # blocked moves leave the display untouched
+        if (x, y) != (self.x, self.y):
+            self.frame[y, x] = self.background_color
+            self.frame[self.y, self.x] = self.ball_color
+            self.screen.push(self.frame)
+
+    def run(self, fast_tick=0.1, slow_tick=0.3, celebrate=True, imu_rate=None):
+        '''
+        Args:
+            fast_tick (float): Period between moves while the hat is tilted hard.
+            slow_tick (float): Period between moves while the hat is near level.
+            celebrate (bool): Play the win animation once the target is hit.
+            imu_rate (float): When set, sample the IMU at this many Hz on a
+                background ImuSampler and steer by its latest filtered
+                reading instead of reading the sensor once per move.
+        '''
+
+        self.imu = None
+        if imu_rate:
+            self.imu = ImuSampler(self.hat, rate=imu_rate)
+            self.imu.start()
+
+        try:
+            if self.imu is not None:
+                self.imu.wait_ready()
+
+            self.scheduler = Scheduler(slow_tick)
+            self.scheduler.start()
+            while self.done is False:    
+                if self.imu is not None:
+                    o = self.imu.latest()
+                else:
+                    o = self.hat.get_orientation_radians()
+                roll = o['roll']
+                pitch = o['pitch']
+
+                if abs(roll) > 0.3 or abs(pitch) > 0.3:
+                    epsilon = fast_tick
+                else:
+                    epsilon = slow_tick
+
+                self.move_ball(roll=roll, pitch=pitch)
+
+                if self.x == self.target_x and self.y == self.target_y:
+                    self.done = True
+                
+                self.scheduler.wait(epsilon)
+        finally:
+            if self.imu is not None:
+                self.imu.stop()
+
+        if celebrate:
+            self.celebrate_win()
 
 
 if __name__ == '__main__':
@@ -139,7 +175,7 @@ if __name__ == '__main__':
     )
 
     roll = Roll(layout)
-    roll.run()
+    roll.run(imu_rate=100)
 
     arr = np.array([
         [1, 1, 1, 1, 1, 1, 1, 1,],
@@ -161,7 +197,7 @@ if __name__ == '__main__':
     )
 
     roll = Roll(layout)
-    roll.run()
+    roll.run(imu_rate=100)
 
     arr = np.array([
         [0, 0, 0, 1, 1, 0, 0, 0,],
@@ -183,6 +219,6 @@ if __name__ == '__main__':
     )
     
     roll = Roll(layout)
-    roll.run()
+    roll.run(imu_rate=100)
 
     roll.hat.clear()
\ No newline at end of file
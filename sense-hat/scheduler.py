@@ -0,0 +1,136 @@
+'''Fixed-timestep scheduler that sleeps until absolute deadlines.
+
+Sleeping for a fixed tick after the work is done makes the real period
+tick + work and lets it drift. Here each deadline is the previous deadline
+plus the period, measured on a monotonic clock, so work time is absorbed
+instead of added.
+'''
+import asyncio
+import math
+import time
+
+
+class Scheduler:
+
+    policies = ('catchup', 'drop')
+
+    def __init__(self, period, policy='catchup', clock=time.monotonic, sleep=time.sleep):
+        '''
+        Args:
+            period (float): Default time between ticks in seconds.
+            policy (str): What to do when a tick runs more than a whole period
+                late. 'catchup' runs the missed ticks back to back until the
+                loop is on schedule again, 'drop' skips them.
+            clock (callable): Monotonic clock returning seconds.
+            sleep (callable): Sleep function taking seconds.
+        '''
+        if policy not in self.policies:
+            raise ValueError('policy must be one of %s, got %r' % (self.policies, policy))
+        self.period = period
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    def reset(self):
+        self.started = None
+        self.deadline = None
+        self.woke = None
+        self.ticks = 0
+        self.dropped = 0
+
+        # running mean and variance of lateness (Welford)
+        self.late_mean = 0.0
+        self.late_m2 = 0.0
+        self.late_max = 0.0
+
+    def start(self):
+        '''Anchor the schedule at the current time.'''
+        self.reset()
+        self.started = self.deadline = self.woke = self.clock()
+
+    def wait(self, period=None):
+        '''Sleep until the next deadline.
+
+        Args:
+            period (float): Time from the previous deadline to the next one.
+                Defaults to the scheduler's period.
+
+        Returns:
+            int: Number of ticks dropped to get back on schedule.
+        '''
+        delay, missed = self.advance(period)
+        if delay > 0:
+            self.sleep(delay)
+        self.finish()
+        return missed
+
+    async def wait_async(self, period=None):
+        '''Like `wait`, but yields to the event loop instead of sleeping.'''
+        delay, missed = self.advance(period)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.finish()
+        return missed
+
+    def advance(self, period):
+        '''Move to the next deadline and return (seconds until it, ticks dropped).'''
+        if self.deadline is None:
+            self.start()
+        period = self.period if period is None else period
+
+        self.deadline += period
+        now = self.clock()
+        missed = 0
+        if now >= self.deadline and self.policy == 'drop' and period > 0:
+            missed = int((now - self.deadline) // period)
+            self.deadline += missed * period
+            self.dropped += missed
+        return self.deadline - now, missed
+
+    def finish(self):
+        self.woke = self.clock()
+        self.ticks += 1
+        self.record(self.woke - self.deadline)
+
+    def record(self, late):
+        delta = late - self.late_mean
+        self.late_mean += delta / self.ticks
+        self.late_m2 += delta * (late - self.late_mean)
+        self.late_max = max(self.late_max, late)
+
+    def run(self, steps):
+        '''Yield the index of each tick to run, waiting between them.
+
+        With the 'drop' policy missed indices are skipped, so the loop still
+        ends `steps` periods after it started.
+        '''
+        self.start()
+        i = 0
+        while i < steps:
+            yield i
+            i += 1 + self.wait()
+
+    @property
+    def fps(self):
+        '''Achieved ticks per second since `start`.'''
+        if not self.ticks or self.woke == self.started:
+            return 0.0
+        return self.ticks / (self.woke - self.started)
+
+    @property
+    def jitter(self):
+        '''Standard deviation of wake-up lateness in seconds.'''
+        if self.ticks < 2:
+            return 0.0
+        return math.sqrt(self.late_m2 / (self.ticks - 1))
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'dropped': self.dropped,
+            'fps': self.fps,
+            'jitter': self.jitter,
+            'late_mean': self.late_mean,
+            'late_max': self.late_max,
+        }
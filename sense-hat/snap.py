@@ -1,42 +1,152 @@
 '''Take picture with camera module and convert to sense hat's 8x8 light grid.
+
+Finished 8x8 frames are cached in memory, keyed by path, mtime and size so
+an edited file is converted again. A whole directory can be converted up
+front in a process pool and saved to a compact cache file with:
+
+    python snap.py --precompute [directory]
 '''
 try:
     from sense_hat import SenseHat
 except ImportError:
-    from sense_emu import SenseHat
+    try:
+        from sense_emu import SenseHat
+    except ImportError:
+        from headless import SenseHat
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import time
 from PIL import Image
+import numpy as np
 import os
 
+CACHE_FILE = 'snap-cache.npz'
+
+
+def convert(image_file, dim=8):
+    '''Decode an image and shrink it to a (dim, dim, 3) uint8 frame.'''
+    with Image.open(image_file) as img:
+        # convert to rgb
+        rgb_img = img.convert('RGB')
+
+        # resize to dim x dim pixels
+        rgb_img_small = rgb_img.resize((dim, dim))
+
+        return np.asarray(rgb_img_small, dtype=np.uint8)
+
+
+def file_key(image_file):
+    st = os.stat(image_file)
+    return (image_file, st.st_mtime_ns, st.st_size)
+
+
+def convert_entry(args):
+    image_file, dim = args
+    return file_key(image_file), convert(image_file, dim)
+
+
+def precompute(directory='static', cache_file=None, dim=8, processes=None):
+    '''Convert every image in `directory` in a process pool and save the frames.
+
+    Args:
+        directory (str): Folder of images.
+        cache_file (str): Where to save them, defaults to CACHE_FILE inside
+            `directory`.
+        dim (int): Side length of the frames.
+        processes (int): Pool size, defaults to the number of CPUs.
+
+    Returns:
+        str: Path of the cache file.
+    '''
+    cache_file = cache_file or os.path.join(directory, CACHE_FILE)
+    extensions = tuple(Image.registered_extensions())
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(extensions))
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        jobs = [(os.path.join(directory, name), dim) for name in names]
+        for name, result in zip(names, pool.map(convert_entry, jobs)):
+            entries.append((name, result))
+
+    # one array per field keeps the file compact and quick to load
+    np.savez_compressed(
+        cache_file,
+        names=np.array([name for name, _ in entries], dtype=str),
+        mtimes=np.array([key[1] for name, (key, _) in entries], dtype=np.int64),
+        sizes=np.array([key[2] for name, (key, _) in entries], dtype=np.int64),
+        frames=np.array([frame for name, (_, frame) in entries], dtype=np.uint8).reshape(-1, dim, dim, 3),
+    )
+    return cache_file
+
+
+def load_cache(cache_file, directory='static'):
+    '''Read a file written by `precompute` into a dict of key -> frame.'''
+    with np.load(cache_file) as data:
+        return {
+            (os.path.join(directory, str(name)), int(mtime), int(size)): frame
+            for name, mtime, size, frame in zip(data['names'], data['mtimes'], data['sizes'], data['frames'])
+        }
+
 
 class Snap:
 
-    def __init__(self):
-        self.hat = SenseHat()
+    def __init__(self, cache_size=64, cache_file=None, hat=None):
+        '''
+        Args:
+            cache_size (int): Most frames kept in the in-memory LRU cache.
+            cache_file (str): Frames saved by `precompute`, used on a cache
+                miss before decoding the image. Defaults to
+                static/snap-cache.npz if it exists.
+            hat (SenseHat): Display to draw on. Defaults to a new SenseHat().
+        '''
+        self.hat = hat if hat is not None else SenseHat()
         self.hat.clear()
         self.dim = 8
 
-    def show_image(self, image_name: str):
-        # open file
+        # key -> pixel list ready for set_pixels, most recently used last
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        cache_file = cache_file or os.path.join('static', CACHE_FILE)
+        self.disk_cache = load_cache(cache_file) if os.path.exists(cache_file) else {}
+
+    def load_image(self, image_name: str):
+        '''Pixel list for an image in static/, converting it only on a cache miss.'''
         image_file = os.path.join('static', image_name)
-        img = Image.open(image_file)
-        
-        # convert to rgb
-        rgb_img = img.convert('RGB')
-        
-        # resize to 8x8 pixels
-        rgb_img_small = rgb_img.resize((self.dim, self.dim))
-        
-        # get pixel data
-        hat_img = rgb_img_small.getdata()
-        
+        key = file_key(image_file)
+
+        pixels = self.cache.get(key)
+        if pixels is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return pixels
+
+        self.misses += 1
+        frame = self.disk_cache.get(key)
+        if frame is None:
+            frame = convert(image_file, self.dim)
+        pixels = frame.reshape(-1, 3).tolist()
+
+        self.cache[key] = pixels
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return pixels
+
+    def show_image(self, image_name: str):
         # display on sense hat
-        self.hat.set_pixels(hat_img)
+        self.hat.set_pixels(self.load_image(image_name))
 
 if __name__ == '__main__':
 
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--precompute':
+        print(precompute(*sys.argv[2:3]))
+        sys.exit()
+
     snap = Snap()
     snap.show_image('unicorn.jpg')
     time.sleep(10)
     snap.hat.clear()
-
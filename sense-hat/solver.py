@@ -0,0 +1,137 @@
+'''Breadth-first distance fields for maze layouts.
+
+A layout's `arr` is indexed [x][y] with 1 for walls, the same as in maze.py
+and roll.py. The distance field holds, for every cell, the number of moves
+to `Layout.end`, or -1 where the end can't be reached. It is computed once
+per layout, after which solvability, the next best move and the shortest
+path are lookups.
+
+Usage:
+    python solver.py [levels]
+'''
+import time
+import numpy as np
+
+# moves as used by Maze.move_ball, with their (dx, dy)
+DIRECTIONS = ('up', 'down', 'left', 'right')
+DELTAS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def shift(arr, dx, dy, fill):
+    '''Return `out` with out[..., x, y] = arr[..., x + dx, y + dy], padded with `fill`.'''
+    out = np.full_like(arr, fill)
+    w, h = arr.shape[-2:]
+    out[..., max(-dx, 0):w - max(dx, 0), max(-dy, 0):h - max(dy, 0)] = \
+        arr[..., max(dx, 0):w - max(-dx, 0), max(dy, 0):h - max(-dy, 0)]
+    return out
+
+
+def distance_fields(walls, ends):
+    '''BFS distance fields for a batch of layouts, all expanded together.
+
+    Args:
+        walls (np.ndarray): Shape (n, w, h), nonzero for walls.
+        ends (np.ndarray): Shape (n, 2), the (x, y) target of each layout.
+
+    Returns:
+        np.ndarray: Shape (n, w, h) of moves to the target, -1 if unreachable.
+    '''
+    passable = np.asarray(walls) == 0
+    ends = np.asarray(ends)
+    dist = np.full(passable.shape, -1, dtype=int)
+
+    frontier = np.zeros(passable.shape, dtype=bool)
+    frontier[np.arange(len(ends)), ends[:, 0], ends[:, 1]] = True
+    frontier &= passable
+
+    d = 0
+    while frontier.any():
+        dist[frontier] = d
+        grown = np.zeros_like(frontier)
+        for dx, dy in DELTAS:
+            grown |= shift(frontier, dx, dy, False)
+        frontier = grown & passable & (dist < 0)
+        d += 1
+    return dist
+
+
+def next_moves(dist):
+    '''Index into DIRECTIONS of the move that gets one step closer, -1 if none.'''
+    moves = np.full(dist.shape, -1, dtype=np.int8)
+    for i, (dx, dy) in reversed(list(enumerate(DELTAS))):
+        neighbor = shift(dist, dx, dy, -1)
+        moves[(dist > 0) & (neighbor == dist - 1)] = i
+    return moves
+
+
+def validate(layouts):
+    '''Check which layouts can be solved, in one vectorized pass.
+
+    Returns:
+        np.ndarray: Shape (n,) of bools.
+    '''
+    walls = np.stack([layout.arr for layout in layouts])
+    ends = np.array([(layout.end.x, layout.end.y) for layout in layouts])
+    starts = np.array([(layout.start.x, layout.start.y) for layout in layouts])
+    dist = distance_fields(walls, ends)
+    return dist[np.arange(len(layouts)), starts[:, 0], starts[:, 1]] >= 0
+
+
+class Solver:
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.dist = distance_fields(
+            np.asarray(layout.arr)[None], [(layout.end.x, layout.end.y)],
+        )[0]
+        self.moves = next_moves(self.dist)
+
+    def solvable(self):
+        return self.distance(self.layout.start.x, self.layout.start.y) >= 0
+
+    def distance(self, x, y):
+        '''Moves from (x, y) to the end, -1 if it can't be reached.'''
+        return int(self.dist[x, y])
+
+    def next_move(self, x, y):
+        '''Direction of the best move from (x, y), None at the end or when stuck.'''
+        i = self.moves[x, y]
+        return DIRECTIONS[i] if i >= 0 else None
+
+    def shortest_path(self, x=None, y=None):
+        '''Cells from (x, y), default the start, to the end, or [] if unsolvable.'''
+        x = self.layout.start.x if x is None else x
+        y = self.layout.start.y if y is None else y
+        if self.dist[x, y] < 0:
+            return []
+        path = [(x, y)]
+        while self.moves[x, y] >= 0:
+            dx, dy = DELTAS[self.moves[x, y]]
+            x, y = x + dx, y + dy
+            path.append((x, y))
+        return path
+
+
+def random_layouts(n, dim=8, density=0.3):
+    '''Random levels with walls at the given density and open start and end cells.'''
+    from maze import Layout
+
+    layouts = []
+    for arr in (np.random.rand(n, dim, dim) < density).astype(int):
+        x, y = np.nonzero(arr == 0)
+        i, j = np.random.choice(len(x), size=2, replace=False)
+        layouts.append(Layout(arr=arr, start=(x[i], y[i]), end=(x[j], y[j])))
+    return layouts
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    layouts = random_layouts(n)
+
+    start = time.perf_counter()
+    ok = validate(layouts)
+    elapsed = time.perf_counter() - start
+    print('%d of %d levels solvable, checked in %.3f s' % (ok.sum(), n, elapsed))
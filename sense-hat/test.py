@@ -1,6 +1,7 @@
 from sense_emu import SenseHat
 import time
 import numpy as np
+from framebuffer import FrameBuffer
 
 
 s = SenseHat()
@@ -17,6 +18,7 @@ class LightMatrix:
     def __init__(self):
         
         self.hat = SenseHat()
+        self.screen = FrameBuffer(self.hat)
 
         self.dim = 8
 
@@ -32,8 +34,7 @@ class LightMatrix:
         ]).reshape(8, 8, -1)
 
     def show(self):
-        arr_list = self.arr.reshape(64, -1).tolist()
-        self.hat.set_pixels(arr_list)
+        return self.screen.push(self.arr)
 
     def set_row(self, row_num, color):
         for i in range(self.dim):
@@ -59,4 +60,5 @@ if __name__ == '__main__':
 
     time.sleep(5)
 
+    print(lm.screen.stats())
     lm.hat.clear()
\ No newline at end of file